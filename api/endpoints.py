@@ -1,60 +1,98 @@
 """
 Game endpoints for creating and managing game sessions.
 """
-import asyncio
 from datetime import datetime
+from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Query
-from sqlalchemy.orm import Session
-from uuid import uuid4
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from api.models import GetGameModel
+from api.models import CreateBatchModel, GetGameModel
 from api.manager import ConnectionManager
-from asynchronous.game_state_manager import monitor_player_disconnect
-from database.database import get_db
-from database.models import Match, Match_Handler
-from utils import game_utils
+from api.rate_limit import TokenBucket
+from api.session import GameSession
+from asynchronous.chat_writer import ChatWriter
+from asynchronous.checkpointer import Checkpointer
+from asynchronous.event_bus import create_event_bus
+from asynchronous.game_state_manager import handle_disconnect_timeout
+from database.allocator import CodeSpaceExhausted, create_match, create_matches
+from database.cache import game_summary
+from database.database import get_db, unit_of_work
+from database.instrumentation import track_game
+from database.models import ChatMessage, Match, Match_Handler
+from database.queries import count_rows
+from utils.metrics import CHAT_MESSAGES_THROTTLED, GAMES_CREATED
+from utils.sharding import is_local, shard_of
 import utils.constants as c
 
 router = APIRouter(tags=["game"])
-manager = ConnectionManager()
+manager = ConnectionManager(create_event_bus())
+checkpointer = Checkpointer()
+chat_writer = ChatWriter()
+
+# Fields of a cached game summary returned by GET /games and POST /game.
+SUMMARY_FIELDS = ("player1", "player1_score", "player2", "player2_score", "game_state")
+DETAIL_FIELDS = ("game_code", "player1", "player2", "player1_score", "player2_score", "round", "game_state")
 
 
 @router.post("/create")
-def create_game(db: Session = Depends(get_db)) -> dict:
+async def create_game(db: AsyncSession = Depends(get_db)) -> dict:
     """
     Create a new game.
     """
-    code = game_utils.generate_random_code(7)
-
-    while db.query(Match).filter(Match.id == code).first() is not None:
-        print("[INFO] Code already exists, generating a new one...")
-        code = game_utils.generate_random_code(7)
-
-    _uuid=uuid4()
+    try:
+        code = await create_match(db)
+    except CodeSpaceExhausted as e:
+        print(f"[ERROR] {e}")
+        raise HTTPException(status_code=503, detail=c.NO_CODE_LEFT_MESSAGE) from e
+    await db.commit()
+    GAMES_CREATED.inc()
 
-    match_model = Match(
-        id=code,
-        uuid=_uuid
-    )
+    return {
+        "ok": True,
+        "code": str(code).zfill(7),
+    }
 
-    match_handler_model = Match_Handler(
-        uuid=_uuid
-    )
-    db.add(match_model)
-    db.add(match_handler_model)
-    db.commit()
+@router.post("/create/batch")
+async def create_games(model: CreateBatchModel, db: AsyncSession = Depends(get_db)) -> dict:
+    """
+    Create several games at once, e.g. before a tournament.
+    All the games are inserted by a single statement.
+    """
+    try:
+        codes = await create_matches(db, model.count)
+    except CodeSpaceExhausted as e:
+        print(f"[ERROR] {e}")
+        raise HTTPException(status_code=503, detail=c.NO_CODE_LEFT_MESSAGE) from e
+    await db.commit()
+    GAMES_CREATED.inc(len(codes))
 
     return {
         "ok": True,
-        "code": code,
+        "codes": [str(code).zfill(7) for code in codes],
     }
 
+async def room_deleted(game_code: int) -> bool:
+    """
+    Whether the room of a game was torn down, used with manager.wait_for.
+    """
+    return manager.get_room(game_code) is None
+
+async def reject_foreign_game(websocket: WebSocket, game_code: int):
+    """
+    Refuse a websocket for a game owned by another shard.
+    """
+    message = c.WRONG_SHARD_MESSAGE.format(shard_of(game_code))
+    await websocket.accept()
+    await websocket.send_json({"error": message})
+    await websocket.close(code=1003, reason=message)
+
+
 @router.websocket("/ws/{game_code}")
 async def join_game(
     websocket: WebSocket,
-    game_code: str,
+    game_code: int,
     player_name: str,
-    db: Session = Depends(get_db),
     token: str = None
     ):
     """
@@ -69,69 +107,65 @@ async def join_game(
     # PLAYER CONNECTION VERIFICATION #
     ##################################
 
-    match = db.query(Match).filter(Match.id == game_code, Match.game_state == "created").first()
+    # The game is played on the in-memory session held by the manager, the database is
+    # only read when the game is not live yet and written in the background by the checkpointer.
+    if not is_local(game_code):
+        await reject_foreign_game(websocket, game_code)
+        return
 
-    if token:
-        match = db.query(Match).filter(Match.id == game_code, Match.game_state == "ongoing").first()
+    track_game(game_code)
+    expected_state = "ongoing" if token else "created"
+    session = manager.get_session(game_code)
+    if not session:
+        async with unit_of_work() as db:
+            rows = (await db.execute(
+                select(Match, Match_Handler)
+                .join(Match_Handler, Match_Handler.uuid == Match.uuid)
+                .where(Match.id == game_code, Match.game_state == expected_state)
+            )).first()
+        if rows:
+            session = await manager.open_session(GameSession.from_rows(*rows))
 
     await websocket.accept()
 
-    if not match:
+    if not session or session.game_state != expected_state:
         await websocket.send_json({"error": c.NOT_FOUND_MESSAGE})
         await websocket.close(code = 1003, reason =c.NOT_FOUND_MESSAGE)
         return
 
-    match_handler = db.query(Match_Handler).filter(Match_Handler.uuid == match.uuid).first()
-
-    if match_handler.is_p1_online and match_handler.is_p2_online:
+    if session.is_p1_online and session.is_p2_online:
         await websocket.send_json({"error": c.GAME_FULL_MESSAGE})
         await websocket.close(code = 1003, reason = c.GAME_FULL_MESSAGE)
         return
 
-    await manager.connect(game_code, player_name, websocket)
+    if session.game_state == "ongoing":
+        if str(manager.reconnection_token(game_code, player_name)) != token:
+            await websocket.send_json({"error": c.INVALID_TOKEN_MESSAGE})
+            await websocket.close(code=1003, reason= c.INVALID_TOKEN_MESSAGE)
+            return
 
-    if match.game_state == "created":
-        await websocket.send_json(
-            {
-                "event": "game_reconnection_token",
-                "message" : c.RECONNECTION_TOKEN_MESSAGE,
-                "reconnection_token": str(manager.reconnection_ids[game_code][player_name]),}
-            )
+        left_at = manager.left_at(game_code, player_name)
+        if left_at and (datetime.now() - left_at).seconds > c.DISCONNECT_TIMEOUT:
+            await websocket.send_json({"error": c.EXPIRED_TOKEN_MESSAGE})
+            await websocket.close(code=1003, reason=c.EXPIRED_TOKEN_MESSAGE)
+            return
 
-    match match.game_state:
+    # Joining adds the player to the session on every worker, the game may be started
+    # by the other player's handler meanwhile.
+    game_state = session.game_state
+    await manager.connect(game_code, player_name, websocket)
+
+    match game_state:
         case "created":
-            if not match.player1:
-                match.player1 = player_name
-                match_handler.is_p1_online = True
-            else:
-                match.player2 = player_name
-                match_handler.is_p2_online = True
+            await manager.send(websocket,
+                {
+                    "event": "game_reconnection_token",
+                    "message" : c.RECONNECTION_TOKEN_MESSAGE,
+                    "reconnection_token": str(manager.reconnection_token(game_code, player_name)),}
+                )
 
         case "ongoing":
-            if not token:
-                await websocket.send_json({"error": c.GAME_IN_PROGRESS_MESSAGE})
-                await websocket.close(code=1003, reason= c.GAME_IN_PROGRESS_MESSAGE)
-                return
-
-            if str(manager.reconnection_ids[game_code][player_name]) != token:
-                await websocket.send_json({"error": c.INVALID_TOKEN_MESSAGE})
-                #print("[INFO] Tokens: ", manager.reconenction_ids[game_code])
-                await websocket.close(code=1003, reason= c.INVALID_TOKEN_MESSAGE)
-                return
-
-            if (datetime.now() - manager.reconnection_timers[game_code][player_name]).seconds > c.DISCONNECT_TIMEOUT:
-                await websocket.send_json({"error": c.EXPIRED_TOKEN_MESSAGE})
-                await websocket.close(code=1003, reason=c.EXPIRED_TOKEN_MESSAGE)
-                return
-
-            if not match.player1:
-                match.player1 = player_name
-                match_handler.is_p1_online = True
-            else:
-                match.player2 = player_name
-                match_handler.is_p2_online = True
-
-            await websocket.send_json(
+            await manager.send(websocket,
                 {
                     "event": "game_connected",
                     "message": c.RECONNECTED_MESSAGE
@@ -146,23 +180,14 @@ async def join_game(
                 }
             )
 
-        case "finished":
-            await websocket.send_json({"error": c.GF_MESSAGE})
-            await websocket.close(code=1003, reason = c.GF_MESSAGE)
-            return
-
-        case "_":
-            await websocket.send_json({"error": c.INVALID_GAME_STATE})
-            raise HTTPException(status_code=400, detail=c.INVALID_GAME_STATE)
-
-    db.commit()
+    checkpointer.save(session)
 
     ##################
     # GAMEPLAY LOGIC #
     ##################
 
     try:
-        rounds = 10
+        rounds = c.ROUNDS
 
         await manager.broadcast(
         game_code,
@@ -173,20 +198,21 @@ async def join_game(
         )
 
         if not await manager.is_room_full(game_code):
-            await websocket.send_json({"event": "game_join_wfp", "message": c.WFPJ_MESSAGE})
-            while not await manager.is_room_full(game_code):
-                await asyncio.sleep(1)
+            await manager.send(websocket, {"event": "game_join_wfp", "message": c.WFPJ_MESSAGE})
+            await manager.wait_for(game_code, lambda: manager.is_room_full(game_code))
 
-        match.game_state = "ongoing"
-        db.commit()
+        await manager.start_game(game_code)
+        checkpointer.save(session)
 
-        for round_number in range(match.round, rounds + 1):
-            db.refresh(match)
-            db.refresh(match_handler)
-            
+        # Predicate used to wait for the other player, the round is resolved by the session
+        # as soon as both choices have been applied, on every worker.
+        async def round_resolved():
+            return session.round > round_number or session.game_state == "finished"
+
+        for round_number in range(session.round, rounds + 1):
 
             if round_number in c.CHAT_ROUND:
-                await websocket.send_json(
+                await manager.send(websocket,
                     {
                         "event" : "chat_possibilty",
                         "message" : "A chatbox can now be opened for players to communicate. Awaiting user confirmation."
@@ -196,12 +222,8 @@ async def join_game(
                     player_choice = await websocket.receive_json()
                     match player_choice["event"]:
                         case "chat_accept":
-                            if player_name == match.player1:
-                                match_handler.p1_chat_accept = True
-                            else:
-                                match_handler.p2_chat_accept = True
-                            db.commit()
-                            await websocket.send_json(
+                            chat_accept = True
+                            await manager.send(websocket,
                                 {
                                     "event" : "chat_accepted",
                                     "message" : "Chat request accepted."                              
@@ -210,11 +232,8 @@ async def join_game(
                             break
 
                         case "chat_decline":
-                            if player_name == match.player1:
-                                match_handler.p1_chat_accept = False
-                            else:
-                                match_handler.p2_chat_accept = False
-                            await websocket.send_json(
+                            chat_accept = False
+                            await manager.send(websocket,
                                 {
                                     "event" : "chat_declined",
                                     "message" : "Chat request declined."                              
@@ -222,19 +241,15 @@ async def join_game(
                             )
                             break
                         case _:
-                            await websocket.send_json(
+                            await manager.send(websocket,
                                 {
                                     "event" : "malformed_request",
                                     "error" : "Unknown event. Please try again."
                                 }
                             )
 
-                db.commit()
-                db.refresh(match_handler)
-
-
-                if match_handler.p1_chat_accept and match_handler.p2_chat_accept:
-                    match_handler.chat_ready = True
+                # Only the choice opening the chat announces it, the other player may be on another worker.
+                if await manager.store_chat_choice(game_code, player_name, chat_accept):
                     await manager.broadcast(
                         game_code,
                         {
@@ -243,38 +258,26 @@ async def join_game(
                         }
                     )
 
-                if match_handler.p1_chat_accept is None or match_handler.p2_chat_accept is None:
-                    await websocket.send_json(
+                if not await manager.has_chat_choices(game_code):
+                    await manager.send(websocket,
                         {
                             "event" : "chat_wfp_choice",
                             "message" : "Waiting for all players to make a choice."
                         }
                     )
-                    while match_handler.p1_chat_accept is None or match_handler.p2_chat_accept is None:
-                        print(match_handler.p1_chat_accept, match_handler.p2_chat_accept)
-                        
-                        db.refresh(match_handler)
-                        await asyncio.sleep(0.5)
+                    await manager.wait_for(game_code, lambda: manager.has_chat_choices(game_code))
 
                         
-                if match_handler.p1_chat_accept and match_handler.p2_chat_accept:
-                    await websocket.send_json(
+                if await manager.is_chat_accepted(game_code):
+                    await manager.send(websocket,
                         {
                             "event" : "game_hold",
                             "message" : "The game is on hold while the chat session is open."
                         }
                     )
-                    while not match_handler.chat_finished:
-                        db.refresh(match_handler)
-                        await asyncio.sleep(2)
-
+                    await manager.wait_for(game_code, lambda: manager.is_chat_finished(game_code))
 
-            match_handler.chat_ready = False
-            match_handler.chat_finished = False
-            match_handler.p1_chat_accept = None
-            match_handler.p2_chat_accept = None
-            match_handler.ready_for_next_round = False
-            await websocket.send_json(
+            await manager.send(websocket,
                 {
                     "event": "game_round_start",
                     "round": round_number,
@@ -286,7 +289,7 @@ async def join_game(
                 player_choice = await websocket.receive_json()
 
                 if not player_choice.get("event"):
-                    await websocket.send_json(
+                    await manager.send(websocket,
                         {
                             "event" : "incorrect_format",
                             "error" : "The format sent does not have an event field."
@@ -294,7 +297,7 @@ async def join_game(
                     )
                     continue
                 if not player_choice.get("content"):
-                    await websocket.send_json(
+                    await manager.send(websocket,
                         {
                             "event" : "malformed_request",
                             "error" : "The received json does not contain any content." 
@@ -305,9 +308,12 @@ async def join_game(
                 match player_choice["event"]:
                     case "game_choice":
                         try:
-                            int(player_choice["content"])
+                            choice = int(player_choice["content"])
+                            # Histories keep a single bit per round.
+                            if choice not in (0, 1):
+                                raise ValueError(choice)
                         except Exception:
-                            await websocket.send_json(
+                            await manager.send(websocket,
                                 {
                                     "event" : "malformed_request",
                                     "error" : f"Unexpected json content for game_choice, expected int = 0,1 - received {player_choice['event']}."
@@ -315,37 +321,16 @@ async def join_game(
                             )
 
                             continue
-                        if player_name == match.player1:
-                            await manager.store_choice(game_code, match.player1)
-                            match.player1_choice_history += str(player_choice["content"])
-                            match_handler.player1_has_finished_round = True
-                        else:
-                            await manager.store_choice(game_code, match.player2)
-                            match.player2_choice_history += str(player_choice["content"])
-                            match_handler.player2_has_finished_round = True
+                        await manager.store_choice(
+                            game_code,
+                            player_name,
+                            round_number,
+                            choice
+                        )
                         break
 
                     case "game_forfeit": # We do not need any content for this event
-                        if player_name == match.player1:
-                            abandoned_player = match.player1_score
-                            remaining_player = match.player2_score
-                        else:
-                            abandoned_player = match.player2_score
-                            remaining_player = match.player1_score
-
-                        scores = game_utils.calculate_forfeit_score(
-                            abandoned_player,
-                            remaining_player,
-                            round_number
-                        )
-
-                        if player_name == match.player1:
-                            match.player1_score = scores[0]
-                            match.player2_score = scores[1]
-                        else:
-                            match.player1_score = scores[1]
-                            match.player2_score = scores[0]
-
+                        await manager.forfeit(game_code, player_name)
                         await manager.broadcast(
                             game_code,
                             {
@@ -354,7 +339,7 @@ async def join_game(
                                 "message" : f"Player {player_name} has surrendered."
                             }
                         )
-                        match.game_state = "finished"
+                        checkpointer.save(session)
                         break
                     case "game_disconnect": # We do not need any content for this event
                         await manager.broadcast(
@@ -364,93 +349,70 @@ async def join_game(
                                 "message": c.DISCONNECT_MESSAGE.format(player_name)
                             }
                         )
-                        if player_name == match.player1:
-                            match_handler.is_p1_online = False
-                        else:
-                            match_handler.is_p2_online = False
-                        await websocket.close()
-                        break
+                        await manager.disconnect(game_code, websocket, player_name)
+                        checkpointer.save(session)
+                        await manager.close(websocket)
+                        return
                     
-            db.commit()
-            if not match.game_state == "finished":
-                if match_handler.player1_has_finished_round and match_handler.player2_has_finished_round:
-                    match_handler.ready_for_next_round = True
-                    match.round += 1
-                    bonusRound = False if not round_number in [9,10] else True 
-                    calculate_score = game_utils.calculate_score(
-                        int(match.player1_choice_history[-1]),
-                        int(match.player2_choice_history[-1]),
-                        bonusRound
-                        )
-                    match.player1_score += calculate_score[0]
-                    match.player2_score += calculate_score[1]
-                    db.commit()
+            if not await round_resolved():
+                await manager.send(websocket, {"event": "game_round_wfp", "message": c.WFP_MESSAGE})
 
+                await manager.wait_for(game_code, round_resolved)
 
-                if not match_handler.ready_for_next_round:
-                    await websocket.send_json({"event": "game_round_wfp", "message": c.WFP_MESSAGE})
+            # The game can end right after the last round was resolved, it is still reported.
+            if session.round <= round_number:
+                break
 
-                    while not match_handler.ready_for_next_round:
-                        db.refresh(match_handler)
-                        await asyncio.sleep(0.1)
+            # Every worker resolves the round, one handler per worker checkpoints it.
+            if manager.claim_round(game_code, round_number):
+                await manager.clear_choices(game_code)
+                checkpointer.save(session)
 
-            match_handler.player1_has_finished_round = False
-            match_handler.player2_has_finished_round = False
-            db.commit()
-            #await manager.clear_choices(game_code)
-            if match.game_state == "finished":
-                break
-            
-            index = 0 if player_name == match.player1 else 1
-            await websocket.send_json({
+            index = 0 if player_name == session.player1 else 1
+            await manager.send(websocket, {
                 "event": "game_round_over",
                 "round": round_number,
-                "score" : [match.player1_score, match.player2_score],
-                "choice" : [match.player1_choice_history[-1], match.player2_choice_history[-1]],
+                "score" : [session.player1_score, session.player2_score],
+                "choice" : [str(choice) for choice in session.last_choices()],
                 "index" : index
             })
 
-        winner = match.player1 if match.player1_score > match.player2_score else match.player2
+        # Both handlers get here, only the one finishing the game announces it and tears down.
+        if await manager.finish_game(game_code):
+            winner = session.player1 if session.player1_score > session.player2_score else session.player2
 
-        if match.player1:
-            await manager.broadcast(game_code,
-                {
-                    "event": "game_over",
-                    "scores": {
-                        match.player1: match.player1_score,
-                        match.player2: match.player2_score,
-                    },
-                    "winner": winner,
-
-                })
-        
-        match_handler.is_p1_online = False
-        match_handler.is_p2_online = False
-        match.game_state = "finished"
-        db.commit()
-        await manager.disconnect_all(game_code)
-        await manager.delete_room(game_code)
+            if session.player1:
+                await manager.broadcast(game_code,
+                    {
+                        "event": "game_over",
+                        "scores": {
+                            session.player1: session.player1_score,
+                            session.player2: session.player2_score,
+                        },
+                        "winner": winner,
+
+                    })
+
+            checkpointer.save(session)
+            await manager.disconnect_all(game_code)
+            await manager.delete_room(game_code)
+        else:
+            # The other handler sends game_over and closes this socket, possibly from another worker.
+            await manager.wait_for(game_code, lambda: room_deleted(game_code))
+        await manager.close(websocket)
     ##############################
     # PLAYER DISCONNECT HANDLING #
     ##############################
 
     except WebSocketDisconnect:
         print("Disconnected because of WebsocketDisconnect.")
-        if manager.reconnection_timers.get(game_code) is None: # this only happens if the async task finished 
+        if manager.get_room(game_code) is None: # this only happens if the async task finished 
             return                                             # which then triggers an async task for each player
                                                                # we don't need that
-        manager.reconnection_timers[game_code][player_name] = datetime.now()
-
-        if player_name == match.player1:
-            match_handler.is_p1_online = False
-        else:
-            match_handler.is_p2_online = False
-        db.commit()
-
-        if not match_handler.is_p1_online and not match_handler.is_p2_online:
-            match.game_state = "finished"
-            db.commit()
-        manager.disconnect(game_code, websocket, player_name)
+        if session.game_state == "finished": # the room is being torn down by the handler that finished the game
+            return
+        await manager.disconnect(game_code, websocket, player_name)
+        checkpointer.save(session)
         await manager.broadcast(
             game_code,
             {
@@ -459,14 +421,22 @@ async def join_game(
             }
         )
 
-        asyncio.create_task(
-            monitor_player_disconnect(game_code, db, manager, websocket, player_name)
+        manager.schedule_disconnect(
+            game_code,
+            player_name,
+            c.DISCONNECT_TIMEOUT,
+            handle_disconnect_timeout,
+            game_code,
+            manager,
+            checkpointer
         )
 
     #pylint: disable=broad-exception-caught
     except Exception as e:
-        await websocket.send_json({"error": str(e)})
-        manager.disconnect(game_code, websocket, player_name)
+        # The error goes through the socket's channel, it is closed once the error is sent.
+        await manager.send(websocket, {"error": str(e)})
+        await manager.close(websocket, code=1003)
+        await manager.disconnect(game_code, websocket, player_name)
         await manager.broadcast(
             game_code,
             {
@@ -474,24 +444,23 @@ async def join_game(
                 "message": c.DISCONNECT_MESSAGE.format(player_name)
             }
         )
-        if player_name == match.player1:
-            match_handler.is_p1_online = False
-        else:
-            match_handler.is_p2_online = False
-        db.commit()
-        await websocket.close(code=1003)
+        checkpointer.save(session)
 
 @router.websocket("/chat/{game_code}")
 async def game_chat(
     websocket: WebSocket,
     game_code: int,
-    player_name: str,
-    db: Session = Depends(get_db)
+    player_name: str
     ):
-    match = db.query(Match).filter(Match.id == game_code, Match.game_state == "ongoing").first()
+    if not is_local(game_code):
+        await reject_foreign_game(websocket, game_code)
+        return
+
+    track_game(game_code)
+    session = manager.get_session(game_code)
     await websocket.accept()
     
-    if not match:
+    if not session or session.game_state != "ongoing":
         await websocket.send_json(
             {
                 "error" : "Game not found."
@@ -499,9 +468,8 @@ async def game_chat(
         )
         await websocket.close(code=1003)
         return
-    match_handler = db.query(Match_Handler).filter(Match_Handler.uuid == match.uuid).first()
 
-    if not player_name in [match.player1, match.player2]:
+    if not player_name in [session.player1, session.player2]:
         await websocket.send_json(
             {
                 "error" : "You are not allowed to join this chat session."
@@ -510,7 +478,7 @@ async def game_chat(
         await websocket.close(code=1003)
         return
 
-    if match_handler.p1_chat_accept is False or match_handler.p2_chat_accept is False:
+    if await manager.is_chat_declined(game_code):
         await websocket.send_json(
             {
                 "error": "Chat session is not open since both players didn't accept the request."
@@ -519,7 +487,7 @@ async def game_chat(
         await websocket.close(code=1003)
         return
 
-    if match_handler.chat_finished:
+    if await manager.is_chat_finished(game_code):
         await websocket.send_json(
             {
                 "error": "Chat session has already been closed."
@@ -527,7 +495,7 @@ async def game_chat(
         )
         await websocket.close(code=1003)
         return
-    if len(manager.chat_sockets) == 2:
+    if await manager.is_chat_full(game_code):
         await websocket.send_json(
             {
                 "error": "Chat session is full."
@@ -545,29 +513,48 @@ async def game_chat(
         }
     )
 
-    if len(manager.chat_sockets) < 2:
-        await websocket.send_json(
+    if not await manager.is_chat_full(game_code):
+        await manager.send(websocket,
             {
                 "event": "chat_wfp_join",
                 "message": "Waiting for all players to join"
             }
         )
-        while len(manager.chat_sockets[game_code]) < 2:
-            await websocket.send_json({str(len(manager.chat_sockets)) : 0})
-            await asyncio.sleep(1)
+        await manager.wait_for(game_code, lambda: manager.is_chat_full(game_code))
 
-    await websocket.send_json(
+    await manager.send(websocket,
         {
             "event" : "chat_open",
             "message" : "All players have connected. Chat is now available."
         }
     )
+    # Messages of the game's earlier chat sessions, a session ends when a player drops.
+    history = manager.chat_history(game_code)
+    if history:
+        await manager.send(websocket,
+            {
+                "event" : "chat_history",
+                "messages" : history
+            }
+        )
+    bucket = TokenBucket(c.CHAT_MESSAGE_RATE, c.CHAT_MESSAGE_BURST)
     try:
         while True:
             p_message = await websocket.receive_json()
 
+            # Stopping the chat is never throttled, every other event takes a token.
+            if p_message.get("event") != "chat_stop" and not bucket.take():
+                CHAT_MESSAGES_THROTTLED.inc()
+                await manager.send(websocket,
+                    {
+                        "event" : "rate_limited",
+                        "error" : c.CHAT_RATE_LIMITED_MESSAGE
+                    }
+                )
+                continue
+
             if not p_message.get("event"):
-                await websocket.send_json(
+                await manager.send(websocket,
                     {
                         "event" : "incorrect_format",
                         "error" : "The format sent does not have an event field."
@@ -575,7 +562,7 @@ async def game_chat(
                 )
                 continue
             if not p_message.get("content"):
-                await websocket.send_json(
+                await manager.send(websocket,
                     {
                         "event" : "malformed_request",
                         "error" : "The received json does not contain any content." 
@@ -591,7 +578,8 @@ async def game_chat(
                     if len(p_message["content"]) > 255:
                         print("Skipped")
                         continue
-                    await manager.chat_broadcast(
+                    chat_writer.add(session.uuid, game_code, player_name, p_message["content"])
+                    await manager.chat_message(
                         game_code,
                         {
                             "event" : "chat_message",
@@ -609,11 +597,11 @@ async def game_chat(
                 "message" : "The chat session has finished."
             }
         )
-        match_handler.chat_finished = True
-        db.commit()
+        await manager.finish_chat(game_code)
         await manager.chat_disconnect_all(game_code)
+        await manager.close(websocket)
     except WebSocketDisconnect:
-        manager.chat_disconnect(game_code, websocket)
+        await manager.chat_disconnect(game_code, websocket)
         await manager.chat_broadcast(
             game_code,
             {
@@ -622,21 +610,21 @@ async def game_chat(
                 "message" : "User has disconnected. The chat session will end."
             }
         )
-        match_handler.chat_finished = True
-        db.commit()
+        await manager.finish_chat(game_code)
         await manager.chat_disconnect_all(game_code)
     except Exception as e:
+        await manager.send(websocket, {"error": str(e)})
+        await manager.close(websocket, code=1003)
         await manager.chat_disconnect(game_code, websocket)
         await manager.chat_broadcast(
             game_code,
             {
                 "event" : "chat_disconnect",
                 "player" : player_name,
-                "message" : e
+                "message" : str(e)
             }
         )
-        match_handler.chat_finished = True
-        db.commit()
+        await manager.finish_chat(game_code)
         await manager.chat_disconnect_all(game_code)
 
 
@@ -646,34 +634,51 @@ async def get_games(
     page_number: int = Query(default=1, ge=1),
     game_state: str = None,
     game_code: int = None,
-    db: Session = Depends(get_db)
+    cursor: int = None,
+    db: AsyncSession = Depends(get_db)
     ):
     """
     Get a list of all active games.
+    Filtering and paging happen in SQL. Pass the returned next_cursor as cursor to get
+    the next page with a keyset scan, page_number is still supported for offset paging.
+    total_games is estimated by the planner on large tables (see total_is_estimate).
     """
-    games = db.query(Match).all()
+    if game_code is not None:
+        return await get_game_by_code(db, game_code, game_state, page_number, cursor)
+
+    statement = select(
+        Match.id,
+        Match.player1,
+        Match.player1_score,
+        Match.player2,
+        Match.player2_score,
+        Match.game_state,
+    )
 
     if game_state:
-        games = [game for game in games if game.game_state == game_state]
-    if game_code:
-        games = [game for game in games if game.id == game_code]
+        statement = statement.where(Match.game_state == game_state)
+
+    total_games, total_is_estimate = await count_rows(db, statement)
+
+    # One extra row tells whether there is a next page.
+    page = statement.order_by(Match.id).limit(page_size + 1)
+    if cursor is not None:
+        page = page.where(Match.id > cursor)
+    else:
+        page = page.offset((page_number - 1) * page_size)
+    games = (await db.execute(page)).all()
 
     if not games:
+        if total_games and cursor is None and page_number > 1:
+            raise HTTPException(status_code=404, detail="Page not found")
         return {
             "ok": True,
             "games": [],
         }
 
-    total_games = len(games)
+    next_cursor = games[page_size - 1].id if len(games) > page_size else None
     total_pages = (total_games + page_size - 1) // page_size
 
-    if page_number > total_pages:
-        raise HTTPException(status_code=404, detail="Page not found")
-
-    start = (page_number - 1) * page_size
-    end = start + page_size
-    paginated_games = games[start:end]
-
     paginated_games = [
         {
             "player1": game.player1,
@@ -682,39 +687,96 @@ async def get_games(
             "player2_score": game.player2_score,
             "game_state": game.game_state,
         }
-        for game in paginated_games
+        for game in games[:page_size]
     ]
     return {
         "ok": True,
         "games": paginated_games,
         "total_games": total_games,
+        "total_is_estimate": total_is_estimate,
         "total_pages": total_pages,
         "current_page": page_number,
+        "next_cursor": next_cursor,
+    }
+
+async def get_game_by_code(db, game_code: int, game_state: str, page_number: int, cursor: int):
+    """
+    GET /games filtered on a single game, served from the game summary cache.
+    """
+    game = await game_summary(db, game_code=game_code)
+    if not game or (game_state and game["game_state"] != game_state) or (
+        cursor is not None and cursor >= game_code
+    ):
+        return {
+            "ok": True,
+            "games": [],
+        }
+    if cursor is None and page_number > 1:
+        raise HTTPException(status_code=404, detail="Page not found")
+    return {
+        "ok": True,
+        "games": [{key: game[key] for key in SUMMARY_FIELDS}],
+        "total_games": 1,
+        "total_is_estimate": False,
+        "total_pages": 1,
+        "current_page": page_number,
+        "next_cursor": None,
     }
 
 @router.post("/game")
 async def fetch_game_details(
     model: GetGameModel,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Fetch details of a specific game using its game code.
+    Fetch details of a specific game using its uuid.
+    Served from the game summary cache, which is invalidated whenever the game is written.
     """
-    game = db.query(Match).filter(Match.uuid == model.uuid).first()
+    game = await game_summary(db, uuid=model.uuid)
 
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
 
-    game_details = {
-        "game_code": game.id,
-        "player1": game.player1,
-        "player2": game.player2,
-        "player1_score": game.player1_score,
-        "player2_score": game.player2_score,
-        "round": game.round,
-        "game_state": game.game_state,
+    return {
+        "ok": True,
+        "game": {key: game[key] for key in DETAIL_FIELDS}
     }
+
+@router.get("/games/{game_uuid}/chat")
+async def get_chat_transcript(
+    game_uuid: UUID,
+    page_size: int = Query(default=50, ge=1, le=200),
+    cursor: int = None,
+    db: AsyncSession = Depends(get_db)
+    ):
+    """
+    Get the chat transcript of a game, oldest messages first.
+    Pass the returned next_cursor as cursor to get the next page with a keyset scan.
+    Messages are written in batches, the last second of chat may not be listed yet.
+    """
+    if not await game_summary(db, uuid=str(game_uuid)):
+        raise HTTPException(status_code=404, detail=c.NOT_FOUND_MESSAGE)
+
+    # One extra row tells whether there is a next page.
+    page = (
+        select(ChatMessage.id, ChatMessage.player, ChatMessage.content, ChatMessage.sent_at)
+        .where(ChatMessage.match_uuid == game_uuid)
+        .order_by(ChatMessage.id)
+        .limit(page_size + 1)
+    )
+    if cursor is not None:
+        page = page.where(ChatMessage.id > cursor)
+    messages = (await db.execute(page)).all()
+
     return {
         "ok": True,
-        "game": game_details
+        "messages": [
+            {
+                "player": message.player,
+                "content": message.content,
+                "sent_at": message.sent_at.isoformat(),
+            }
+            for message in messages[:page_size]
+        ],
+        "next_cursor": messages[page_size - 1].id if len(messages) > page_size else None,
     }
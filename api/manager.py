@@ -10,157 +10,684 @@ This class handles the following functionalities:
 7. Monitor player disconnects and handle game state accordingly.
 8. Store reconnection tokens for players.
 9. Handle reconnection timers for players.
+10. Wake handlers waiting for the other player's state transitions.
+11. Share room state and broadcasts with the other workers through an event bus.
+12. Send messages through a bounded per-socket queue so slow clients do not block the room.
+13. Schedule the disconnect timeouts of players, cancelled when they join again.
+14. Hold the GameSession of every live game, rounds are resolved in memory.
+15. Sweep the rooms left behind by games nobody comes back to.
+16. Coalesce the chat messages sent within a tick into a single broadcast.
+17. Keep the recent chat messages of every room for the game's next chat session.
 """
 
-from uuid import uuid4
+import asyncio
+import sys
+import time
+import weakref
+from functools import partial
+from uuid import UUID, uuid4
 from datetime import datetime
 
+from api.outbound import OutboundChannel
+from api.room import Room
+from api.session import GameSession
+from asynchronous.event_bus import InMemoryEventBus
+from asynchronous.scheduler import DeadlineScheduler
+from utils.constants import (
+    CHAT_BATCH_INTERVAL,
+    FINISHED_ROOM_TIMEOUT,
+    ROOM_IDLE_TIMEOUT,
+    ROOM_SWEEP_INTERVAL,
+)
+from utils.metrics import BROADCAST_FANOUT, CHAT_BATCH_SIZE, ROOMS_SWEPT, ROUND_RESOLUTION
+from utils.serialization import encode
+
+def approximate_size(value, seen=None) -> int:
+    """
+    Rough memory footprint of a value in bytes, following containers and slotted objects.
+    Other objects (sockets, channels) are only counted shallowly.
+    """
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(
+            approximate_size(key, seen) + approximate_size(item, seen) for key, item in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(approximate_size(item, seen) for item in value)
+    elif hasattr(value, "__slots__"):
+        size += sum(approximate_size(getattr(value, name, None), seen) for name in value.__slots__)
+    return size
+
 class ConnectionManager:
     """
     Manages WebSocket connections for a game session.
     Handles player connections, disconnections, and broadcasts messages.
+
+    Every game is a Room. Sockets are local to the worker, everything else (players, tokens,
+    timers, chat members, session) is only changed by applying events from the bus, so all
+    workers see the same rooms.
     """
-    def __init__(self):
-        # Stores active WebSocket connections for each game session
-        self.active_connections = {}
-        self.reconnection_ids = {}
-        self.sockets = {}
-        self.reconnection_timers = {}
-        self.chat_sockets = {}
+    def __init__(self, bus=None, scheduler=None):
+        self.rooms = {}
+        self.channels = {}
+        # Sockets taken out of their room when their channel closed on its own (slow consumer,
+        # client gone), their handler still announces the departure on disconnect.
+        self.detached = weakref.WeakSet()
+        self.waiters = {}
+        self.swept = 0
+        self.sweeper = None
+        # Chat messages of this worker waiting for the next tick, per game
+        self.chat_batches = {}
+        self.chat_ticker = None
+        self.bus = bus or InMemoryEventBus()
+        self.bus.subscribe(self.apply)
+        self.scheduler = scheduler or DeadlineScheduler()
+
+    async def start(self):
+        """
+        Start the event bus, the scheduler, the sweeper and the chat ticker when chat messages
+        are coalesced, must be called before serving requests.
+        """
+        await self.bus.start()
+        await self.scheduler.start()
+        self.sweeper = asyncio.create_task(self._sweep_periodically())
+        if CHAT_BATCH_INTERVAL > 0:
+            self.chat_ticker = asyncio.create_task(self._flush_chat_periodically())
+
+    async def stop(self):
+        """
+        Stop the event bus, the scheduler, the sweeper and the chat ticker.
+        """
+        if self.sweeper:
+            self.sweeper.cancel()
+        if self.chat_ticker:
+            self.chat_ticker.cancel()
+        await self.scheduler.stop()
+        await self.bus.stop()
+
+    async def apply(self, event: dict):
+        """
+        Apply an event published by any worker to the local view of the rooms.
+        """
+        game_code = event["game"]
+        room = self.rooms.get(game_code)
+        if room:
+            room.last_activity = time.monotonic()
+        match event["type"]:
+            case "join":
+                room = room or self._room(game_code)
+                room.join(event["player"], UUID(event["token"]))
+                self.scheduler.cancel((game_code, event["player"]))
+                if room.session:
+                    room.session.add_player(event["player"])
+                print(room.players)
+                self._wake(game_code)
+            case "leave":
+                if room:
+                    room.leave(event["player"], datetime.fromisoformat(event["time"]))
+                    if room.session:
+                        room.session.leave(event["player"])
+                self._wake(game_code)
+            case "choice":
+                if room:
+                    room.choose(event["player"])
+                    session = room.session
+                    if session:
+                        round_number = session.round
+                        if event["round"] == round_number and room.round_clock is None:
+                            room.round_clock = time.perf_counter()
+                        session.record_choice(event["player"], event["round"], event["choice"])
+                        if session.round > round_number:
+                            ROUND_RESOLUTION.observe(time.perf_counter() - room.round_clock)
+                            room.round_clock = None
+                self._wake(game_code)
+            case "clear_choices":
+                if room:
+                    room.clear_choices()
+            case "open_session":
+                room = room or self._room(game_code)
+                if room.session is None:
+                    room.session = GameSession.from_snapshot(event["session"])
+            case "start":
+                if room and room.session:
+                    room.session.start()
+            case "forfeit":
+                if room and room.session:
+                    room.session.forfeit(event["player"])
+                self._wake(game_code)
+            case "finish":
+                if room and room.session:
+                    room.claim("finish", event["claim"])
+                    room.session.finish()
+                self._wake(game_code)
+            case "chat_choice":
+                if room and room.session:
+                    room.session.store_chat_choice(event["player"], event["accept"])
+                    if room.session.is_chat_accepted():
+                        room.claim(("chat_start", room.session.round), event["claim"])
+                self._wake(game_code)
+            case "chat_finished":
+                if room and room.session:
+                    room.session.chat_finished = True
+                self._wake(game_code)
+            case "broadcast":
+                connections = list(room.sockets) if room else []
+                BROADCAST_FANOUT.observe(len(connections))
+                for connection in connections:
+                    await self.send_frame(connection, event["frame"])
+            case "disconnect_all":
+                if room and room.sockets:
+                    connections, room.sockets = list(room.sockets), {}
+                    print(connections)
+                    for connection in connections:
+                        print(f"Disconnecting {connection.client} from game {game_code}")
+                        self._request_close(connection, code=1000, reason="Game Over")
+            case "chat_join":
+                room = room or self._room(game_code)
+                room.chat_members += 1
+                self._wake(game_code)
+            case "chat_leave":
+                if room and room.chat_members:
+                    room.chat_members -= 1
+            case "chat_broadcast":
+                for connection in list(room.chat_sockets) if room else []:
+                    await self.send_frame(connection, event["frame"])
+            case "chat_messages":
+                if room:
+                    room.remember_chat(event["messages"])
+                    if room.chat_sockets:
+                        frame = encode(
+                            {"event": "chat_batch", "messages": event["messages"]}
+                            if event["batch"] else event["messages"][0]
+                        )
+                        for connection in list(room.chat_sockets):
+                            await self.send_frame(connection, frame)
+            case "chat_disconnect_all":
+                if room:
+                    room.chat_members = 0
+                    connections, room.chat_sockets = list(room.chat_sockets), {}
+                    for connection in connections:
+                        self._request_close(connection, code=1000, reason="Chat has ended.")
+            case "delete_room":
+                self._forget_room(game_code)
+
+    def _room(self, game_code: str) -> Room:
+        room = self.rooms.get(game_code)
+        if room is None:
+            room = self.rooms[game_code] = Room(time.monotonic())
+        return room
+
+    def get_room(self, game_code: str):
+        """
+        Get the room of a game, None if this worker does not know the game.
+        """
+        return self.rooms.get(game_code)
+
+    def reconnection_token(self, game_code: str, player_name: str):
+        """
+        Reconnection token given to a player when they first joined, None if there is none.
+        """
+        room = self.rooms.get(game_code)
+        return room.tokens.get(player_name) if room else None
+
+    def left_at(self, game_code: str, player_name: str):
+        """
+        Time a player last disconnected from a game, None if they never did.
+        """
+        room = self.rooms.get(game_code)
+        return room.left_at.get(player_name) if room else None
 
     async def connect(self, game_code: str, player_name: str, websocket):
         """
         Connect a player to a game session.
         If the game session does not exist, create a new one.
         """
-        if game_code not in self.active_connections:
-            self.active_connections[game_code] = {}
-            self.reconnection_ids[game_code] = {}
-            self.sockets[game_code] = []
-            self.reconnection_timers[game_code] = {}
+        self._room(game_code).sockets[websocket] = None
+        self._open_channel(game_code, websocket)
+        await self.bus.publish(
+            {"type": "join", "game": game_code, "player": player_name, "token": str(uuid4())}
+        )
 
-        self.active_connections[game_code][player_name] = 0
-        if not player_name in self.reconnection_ids[game_code]:
-            self.reconnection_ids[game_code][player_name] =  uuid4()
-        self.sockets[game_code].append(websocket) # Initialize choice to 0 or any default value
-        print(self.active_connections[game_code])
-
-    def disconnect(self, game_code: str, websocket, player_name: str):
+    async def disconnect(self, game_code: str, websocket, player_name: str):
         """
         Disconnect a player from a game session.
         If the player is not found, do nothing.
         """
-        if game_code in self.sockets:
-            self.active_connections[game_code].pop(player_name, None)
-            self.sockets[game_code].remove(websocket)
-            self.reconnection_timers[game_code][websocket] = datetime.now()
+        room = self.rooms.get(game_code)
+        if room and self._take_socket(room.sockets, websocket):
+            self._close_channel(websocket)
+            await self.bus.publish(
+                {
+                    "type": "leave",
+                    "game": game_code,
+                    "player": player_name,
+                    "time": datetime.now().isoformat()
+                }
+            )
+
+    def schedule_disconnect(self, game_code: str, player_name: str, delay: float, callback, *args):
+        """
+        Run callback(*args) if the player has not joined the game again within delay seconds.
+        The deadline is kept by this worker, a join on any worker cancels it.
+        """
+        self.scheduler.schedule((game_code, player_name), delay, callback, *args)
 
     async def disconnect_all(self, game_code: str):
         """
         Disconnect all players from a game session.
         This is used when the game is over or when a player has been disconnected for too long.
         """
-        if game_code in self.sockets:
-            print(self.sockets[game_code])
-            for connection in self.sockets[game_code]:
-                print(f"Disconnecting {connection.client} from game {game_code}")
-                await connection.close(code=1000, reason="Game Over")
-            del self.sockets[game_code]
+        await self.bus.publish({"type": "disconnect_all", "game": game_code})
 
     async def broadcast(self, game_code: str, message: dict):
-        """Broadcast a message to all connections in a given game session."""
-
-        if game_code in self.sockets:
-            for connection in self.sockets[game_code]:
-                await connection.send_json(message)
+        """
+        Broadcast a message to all connections in a given game session.
+        The message is encoded once and the same frame is sent to every socket.
+        """
+        await self.bus.publish({"type": "broadcast", "game": game_code, "frame": encode(message)})
 
     async def get_websocket(self,game_code: str, player_name: str):
         """
         Get the WebSocket connection for a specific game session.
         """
-        if game_code in self.active_connections:
-            for connection in self.active_connections[game_code]:
-                if connection == player_name:
-                    return connection
+        room = self.rooms.get(game_code)
+        if room and player_name in room.players:
+            return player_name
 
-    async def store_choice(self, game_code: str, player_name: str):
+    async def store_choice(self, game_code: str, player_name: str, round_number: int, choice: int):
         """
         Store the player's choice for the current round.
         """
-        if game_code in self.active_connections:
-            self.active_connections[game_code][player_name] = 1
+        await self.bus.publish(
+            {
+                "type": "choice",
+                "game": game_code,
+                "player": player_name,
+                "round": round_number,
+                "choice": choice
+            }
+        )
+
+    def claim_round(self, game_code: str, round_number: int):
+        """
+        Returns True only the first time it is called for a round on this worker,
+        so a single handler per worker checkpoints the round.
+        """
+        room = self.rooms.get(game_code)
+        if room is None or room.claimed_round >= round_number:
+            return False
+        room.claimed_round = round_number
+        return True
 
     async def has_choice(self, game_code: str):
         """
         Check if a player has made a choice in the current round.
         """
-        if game_code in self.active_connections:
-            for connection in self.active_connections[game_code]:
-                if self.active_connections[game_code][connection] == 0:
-                    return False
-        return True
+        room = self.rooms.get(game_code)
+        return room is None or room.waiting == 0
 
     async def clear_choices(self, game_code: str):
         """
         Clear the choices for all players in the current round.
         """
-        if game_code in self.active_connections:
-            for connection in self.active_connections[game_code]:
-                self.active_connections[game_code][connection] = 0
+        await self.bus.publish({"type": "clear_choices", "game": game_code})
+
+    async def open_session(self, session: GameSession):
+        """
+        Share a session loaded from the database with every worker.
+        Returns the session held by the manager, which is kept if it already exists.
+        """
+        if self.get_session(session.code) is None:
+            await self.bus.publish(
+                {"type": "open_session", "game": session.code, "session": session.snapshot()}
+            )
+        return self.rooms[session.code].session
+
+    def get_session(self, game_code: str):
+        """
+        Get the session of a live game, None if it is not held by this worker.
+        """
+        room = self.rooms.get(game_code)
+        return room.session if room else None
+
+    async def start_game(self, game_code: str):
+        """
+        Start the game once both players have joined.
+        """
+        await self.bus.publish({"type": "start", "game": game_code})
+
+    async def forfeit(self, game_code: str, player_name: str):
+        """
+        End the game in favour of the other player.
+        """
+        await self.bus.publish({"type": "forfeit", "game": game_code, "player": player_name})
+
+    async def finish_game(self, game_code: str) -> bool:
+        """
+        Mark the game as finished.
+        Returns True only for the first caller on any worker, which then announces the result
+        and tears the room down.
+        """
+        claim = uuid4().hex
+        await self.bus.publish({"type": "finish", "game": game_code, "claim": claim})
+        room = self.rooms.get(game_code)
+        return room is not None and room.claims.get("finish") == claim
+
+    async def store_chat_choice(self, game_code: str, player_name: str, accept: bool) -> bool:
+        """
+        Store whether the player accepted the chat offered this round.
+        Returns True only for the choice opening the chat, whose handler announces it.
+        """
+        claim = uuid4().hex
+        await self.bus.publish(
+            {
+                "type": "chat_choice",
+                "game": game_code,
+                "player": player_name,
+                "accept": accept,
+                "claim": claim
+            }
+        )
+        room = self.rooms.get(game_code)
+        return (
+            room is not None and room.session is not None
+            and room.claims.get(("chat_start", room.session.round)) == claim
+        )
+
+    async def has_chat_choices(self, game_code: str):
+        """
+        Check if both players have answered the chat request.
+        """
+        session = self.get_session(game_code)
+        return session is not None and session.has_chat_choices()
+
+    async def is_chat_accepted(self, game_code: str):
+        """
+        Check if both players have accepted the chat request.
+        """
+        session = self.get_session(game_code)
+        return session is not None and session.is_chat_accepted()
+
+    async def is_chat_declined(self, game_code: str):
+        """
+        Check if a player has declined the chat request.
+        """
+        session = self.get_session(game_code)
+        return session is not None and session.is_chat_declined()
+
+    async def finish_chat(self, game_code: str):
+        """
+        Mark the chat session of the current round as finished.
+        """
+        await self.bus.publish({"type": "chat_finished", "game": game_code})
+
+    async def is_chat_finished(self, game_code: str):
+        """
+        Check if the chat session of the current round has finished.
+        """
+        session = self.get_session(game_code)
+        return session is not None and session.chat_finished
 
     async def is_room_full(self, game_code: str):
         """
         Check if the game room is full (i.e., has two players).
         """
-        if game_code in self.active_connections:
-            return len(self.active_connections[game_code]) == 2
-        return False
+        room = self.rooms.get(game_code)
+        return room is not None and room.is_full()
 
     async def chat_connect(self, game_code: str, websocket):
         """
         Connect a player to a game session.
         If the game session does not exist, create a new one.
         """
-        if not game_code in self.chat_sockets:
-            self.chat_sockets[game_code] = []
-        self.chat_sockets[game_code].append(websocket)
+        self._room(game_code).chat_sockets[websocket] = None
+        self._open_channel(game_code, websocket)
+        await self.bus.publish({"type": "chat_join", "game": game_code})
 
-    def chat_disconnect(self, game_code: str, websocket):
+    async def chat_disconnect(self, game_code: str, websocket):
         """
         Disconnect a player from a game session.
         If the player is not found, do nothing.
         """
-        if game_code in self.chat_sockets:
-            self.chat_sockets[game_code].remove(websocket)
+        room = self.rooms.get(game_code)
+        if room and self._take_socket(room.chat_sockets, websocket):
+            self._close_channel(websocket)
+            await self.bus.publish({"type": "chat_leave", "game": game_code})
+
+    async def is_chat_full(self, game_code: str):
+        """
+        Check if both players have joined the chat session of a game.
+        """
+        room = self.rooms.get(game_code)
+        return room is not None and room.chat_members == 2
 
     async def chat_disconnect_all(self, game_code: str):
         """
         Disconnect all players from a game session.
         This is used when the game is over or when a player has been disconnected for too long.
         """
-        if game_code in self.chat_sockets:
-            for connection in self.chat_sockets[game_code]:
-                await connection.close(code=1000, reason="Chat has ended.")
-            del self.chat_sockets[game_code]
+        await self.bus.publish({"type": "chat_disconnect_all", "game": game_code})
+
+    def chat_history(self, game_code: str) -> list:
+        """
+        Recent chat messages of a game, oldest first, read from memory.
+        """
+        room = self.rooms.get(game_code)
+        return list(room.chat_history) if room and room.chat_history else []
 
     async def chat_broadcast(self, game_code: str, message: dict):
-        """Broadcast a message to all connections in a given game session."""
-        if game_code in self.chat_sockets:
-            for connection in self.chat_sockets[game_code]:
-                await connection.send_json(message)
-    
+        """
+        Broadcast a message to all chat connections in a given game session.
+        The message is encoded once and the same frame is sent to every socket.
+        Chat messages still waiting for the tick are broadcast first, so the order is kept.
+        """
+        await self.flush_chat(game_code)
+        await self.bus.publish(
+            {"type": "chat_broadcast", "game": game_code, "frame": encode(message)}
+        )
+
+    async def chat_message(self, game_code: str, message: dict):
+        """
+        Broadcast a chat message sent by a player and add it to the room's chat history.
+        With CHAT_BATCH_INTERVAL set, the message waits for the next tick and every message of
+        the game sent through this worker within the tick goes out as a single chat_batch frame.
+        """
+        if CHAT_BATCH_INTERVAL <= 0:
+            await self.bus.publish(
+                {"type": "chat_messages", "game": game_code, "messages": [message], "batch": False}
+            )
+            return
+        self.chat_batches.setdefault(game_code, []).append(message)
+
+    async def flush_chat(self, game_code: str):
+        """
+        Broadcast the chat messages of a game waiting for the tick, if any.
+        """
+        messages = self.chat_batches.pop(game_code, None)
+        if messages:
+            CHAT_BATCH_SIZE.observe(len(messages))
+            await self.bus.publish(
+                {"type": "chat_messages", "game": game_code, "messages": messages, "batch": True}
+            )
+
+    async def _flush_chat_periodically(self):
+        while True:
+            await asyncio.sleep(CHAT_BATCH_INTERVAL)
+            for game_code in list(self.chat_batches):
+                #pylint: disable=broad-exception-caught
+                try:
+                    await self.flush_chat(game_code)
+                except Exception as e:
+                    print(f"[ERROR] Could not broadcast the chat messages of game {game_code}: {e}")
+
     async def delete_room(self, game_code: str):
         """
         Delete a game room and all associated data.
         This is used when the game is over or when a player has been disconnected for too long.
         """
-        if game_code in self.active_connections:
-            del self.active_connections[game_code]
-        if game_code in self.reconnection_ids:
-            del self.reconnection_ids[game_code]
-        if game_code in self.sockets:
-            del self.sockets[game_code]
-        if game_code in self.reconnection_timers:
-            del self.reconnection_timers[game_code]
-        if game_code in self.chat_sockets:
-            del self.chat_sockets[game_code]
+        await self.bus.publish({"type": "delete_room", "game": game_code})
+
+    async def send(self, websocket, message: dict):
+        """
+        Queue a message for a connected socket.
+        Messages sent to a socket, directly or through a broadcast, are delivered in order.
+        """
+        await self.send_frame(websocket, encode(message))
+
+    async def send_frame(self, websocket, frame: str):
+        """
+        Queue an already encoded JSON frame for a connected socket.
+        Frames for a socket without a channel (closed, evicted or disconnected) are dropped,
+        a send never waits on the socket itself.
+        """
+        channel = self.channels.get(websocket)
+        if channel:
+            channel.offer(frame)
+
+    async def close(self, websocket, code: int = 1000, reason: str = None):
+        """
+        Close a connected socket once its queued messages have been sent.
+        Returns once the socket is closed, so a handler can safely return afterwards.
+        Only the handler owning the socket waits here, events use _request_close.
+        """
+        channel = self.channels.get(websocket)
+        if channel:
+            channel.close(code, reason)
+            await channel.wait_closed()
+            return
+        #pylint: disable=broad-exception-caught
+        try:
+            await websocket.close(code=code, reason=reason)
+        except Exception:
+            # Already closed, by its own channel or by the client.
+            pass
+
+    def _request_close(self, websocket, code: int, reason: str):
+        # Applying an event never waits on a socket, the writer sends the queued frames and
+        # closes it on its own while the owning handler waits in close().
+        channel = self.channels.get(websocket)
+        if channel:
+            channel.close(code, reason)
+
+    def _forget_room(self, game_code: str):
+        room = self.rooms.pop(game_code, None)
+        self.chat_batches.pop(game_code, None)
+        if room:
+            for player_name in room.tokens:
+                self.scheduler.cancel((game_code, player_name))
+        self._wake(game_code)
+
+    def sweep(self, now: float = None) -> list:
+        """
+        Forget the rooms nobody is coming back to, returns their codes.
+        A room is swept once it has no socket on this worker, no pending disconnect timeout
+        and no event for ROOM_IDLE_TIMEOUT seconds (FINISHED_ROOM_TIMEOUT once the game is
+        over). Sweeping only changes this worker's view, every worker sweeps its own.
+        """
+        now = time.monotonic() if now is None else now
+        waiting = {key[0] for key in self.scheduler.pending_keys()}
+        swept = []
+        for game_code, room in list(self.rooms.items()):
+            if not room.is_idle() or game_code in waiting:
+                continue
+            over = room.session is None or room.session.game_state == "finished"
+            if now - room.last_activity >= (FINISHED_ROOM_TIMEOUT if over else ROOM_IDLE_TIMEOUT):
+                self._forget_room(game_code)
+                swept.append(game_code)
+        self.swept += len(swept)
+        ROOMS_SWEPT.inc(len(swept))
+        return swept
+
+    async def _sweep_periodically(self):
+        while True:
+            await asyncio.sleep(ROOM_SWEEP_INTERVAL)
+            swept = self.sweep()
+            if swept:
+                print(f"[INFO] Swept {len(swept)} abandoned rooms.")
+
+    def room_stats(self) -> dict:
+        """
+        Number of rooms and sessions, with the entries and approximate memory of the manager.
+        """
+        structures = {
+            "rooms": self.rooms,
+            "channels": self.channels,
+            "waiters": self.waiters,
+            "chat_batches": self.chat_batches,
+        }
+        sizes = {
+            name: {"entries": len(structure), "bytes": approximate_size(structure)}
+            for name, structure in structures.items()
+        }
+        states = {}
+        for room in self.rooms.values():
+            if room.session:
+                states[room.session.game_state] = states.get(room.session.game_state, 0) + 1
+        return {
+            "rooms": len(self.rooms),
+            "sessions": states,
+            "disconnect_timers": self.scheduler.pending(),
+            "swept": self.swept,
+            "approximate_bytes": sum(size["bytes"] for size in sizes.values()),
+            "bytes_per_room": sizes["rooms"]["bytes"] // len(self.rooms) if self.rooms else 0,
+            "structures": sizes,
+        }
+
+    def _open_channel(self, game_code: str, websocket):
+        self.channels[websocket] = OutboundChannel(
+            websocket,
+            on_close=partial(self._forget_channel, game_code)
+        )
+
+    def _close_channel(self, websocket):
+        channel = self.channels.pop(websocket, None)
+        if channel:
+            channel.stop()
+
+    def _forget_channel(self, game_code: str, channel):
+        # Only channels that closed on their own are still registered, the socket then stops
+        # receiving broadcasts until its handler disconnects it.
+        if self.channels.get(channel.websocket) is not channel:
+            return
+        del self.channels[channel.websocket]
+        room = self.rooms.get(game_code)
+        if room is None:
+            return
+        for sockets in (room.sockets, room.chat_sockets):
+            if channel.websocket in sockets:
+                del sockets[channel.websocket]
+                self.detached.add(channel.websocket)
+
+    def _take_socket(self, sockets: dict, websocket) -> bool:
+        """
+        Remove a socket from a room, True if it was still part of it, even if detached.
+        """
+        if websocket in sockets:
+            del sockets[websocket]
+            return True
+        if websocket in self.detached:
+            self.detached.discard(websocket)
+            return True
+        return False
+
+    def _wake(self, game_code: str):
+        waiter = self.waiters.pop(game_code, None)
+        if waiter:
+            waiter.set()
+
+    async def wait_for(self, game_code: str, predicate):
+        """
+        Wait until the async predicate returns True.
+        The predicate is only re-evaluated when an event of the game is applied, so no polling happens.
+        The waiter is taken before evaluating the predicate so an event applied
+        while the predicate runs is never lost.
+        """
+        while True:
+            waiter = self.waiters.setdefault(game_code, asyncio.Event())
+            if await predicate():
+                return
+            await waiter.wait()
@@ -1,8 +1,14 @@
 """
 Models for game endpoints.
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from utils.constants import MAX_BATCH_GAMES
 
 class GetGameModel(BaseModel):
     """Model for GetGame endpoint"""
     uuid: str
+
+class CreateBatchModel(BaseModel):
+    """Model for CreateBatch endpoint"""
+    count: int = Field(ge=1, le=MAX_BATCH_GAMES)
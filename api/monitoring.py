@@ -0,0 +1,95 @@
+"""
+Prometheus metrics endpoint.
+"""
+
+import time
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import func, select
+
+from api.endpoints import manager, checkpointer
+from database.cache import GAME_CACHE
+from database.database import unit_of_work, pool_status
+from database.models import Match
+from utils.constants import GAME_COUNT_INTERVAL
+from utils.metrics import REGISTRY
+
+router = APIRouter(tags=["monitoring"])
+
+# Games per state are counted in the database at most every GAME_COUNT_INTERVAL seconds.
+game_counts = {"counted_at": None, "counts": {}}
+
+REGISTRY.gauge(
+    "game_rooms_active",
+    "Rooms with at least one player.",
+    lambda: sum(1 for room in manager.rooms.values() if room.players)
+)
+REGISTRY.gauge(
+    "game_sessions_active",
+    "Live games held in memory.",
+    lambda: sum(1 for room in manager.rooms.values() if room.session)
+)
+REGISTRY.gauge(
+    "websocket_game_sockets",
+    "Game websockets connected to this worker.",
+    lambda: sum(len(room.sockets) for room in manager.rooms.values())
+)
+REGISTRY.gauge(
+    "chat_rooms_active",
+    "Chat sessions with at least one player.",
+    lambda: sum(1 for room in manager.rooms.values() if room.chat_members)
+)
+REGISTRY.gauge(
+    "websocket_chat_sockets",
+    "Chat websockets connected to this worker.",
+    lambda: sum(len(room.chat_sockets) for room in manager.rooms.values())
+)
+REGISTRY.gauge(
+    "disconnect_timers_pending",
+    "Disconnect timeouts waiting to fire on this worker.",
+    lambda: manager.scheduler.pending()
+)
+REGISTRY.gauge(
+    "checkpoints_pending",
+    "Game sessions waiting to be written to the database.",
+    lambda: len(checkpointer.pending)
+)
+REGISTRY.gauge(
+    "db_pool_checked_out",
+    "Database connections currently checked out of the pool.",
+    lambda: pool_status()["checked_out"]
+)
+REGISTRY.gauge(
+    "game_cache_entries",
+    "Game summaries held in the cache.",
+    lambda: len(GAME_CACHE)
+)
+REGISTRY.gauge(
+    "games",
+    f"Games per state, counted at most every {GAME_COUNT_INTERVAL} seconds.",
+    lambda: game_counts["counts"],
+    label="game_state"
+)
+
+async def count_games():
+    """
+    Refresh the number of games per state if the last count is too old.
+    """
+    now = time.monotonic()
+    if game_counts["counted_at"] is not None and now - game_counts["counted_at"] < GAME_COUNT_INTERVAL:
+        return
+    game_counts["counted_at"] = now
+    async with unit_of_work() as db:
+        rows = await db.execute(
+            select(Match.game_state, func.count()).group_by(Match.game_state)
+        )
+        game_counts["counts"] = dict(rows.all())
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Metrics of this worker in the Prometheus text format.
+    """
+    await count_games()
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,145 @@
+"""
+Outbound channel used by the ConnectionManager for every connected WebSocket.
+Each socket gets a bounded queue drained by its own writer task, so a broadcast only
+enqueues messages and a slow or half-dead client can never delay the other players.
+Messages are queued as already encoded JSON text frames.
+"""
+
+import asyncio
+import time
+
+from utils.constants import OUTBOUND_QUEUE_SIZE, SEND_TIMEOUT, SLOW_CONSUMER_POLICY
+from utils.metrics import SEND_LATENCY, SLOW_CONSUMERS
+
+SLOW_CONSUMER_REASON = "Slow consumer"
+
+class OutboundChannel:
+    """
+    Bounded outbound queue and writer task for a single WebSocket.
+
+    When the queue is full or a send takes longer than send_timeout the consumer is
+    considered slow and the policy applies:
+    - "disconnect": the socket is closed, the handler then goes through its usual
+      disconnect / reconnect path.
+    - "drop_oldest": the oldest queued message is dropped to make room (queue overflow only,
+      a stalled send still disconnects).
+    """
+    def __init__(
+        self,
+        websocket,
+        max_size: int = OUTBOUND_QUEUE_SIZE,
+        send_timeout: float = SEND_TIMEOUT,
+        policy: str = SLOW_CONSUMER_POLICY,
+        on_close=None
+        ):
+        self.websocket = websocket
+        self.send_timeout = send_timeout
+        self.policy = policy
+        self.on_close = on_close
+        self.queue = asyncio.Queue(maxsize=max_size)
+        self.closed = False
+        self.writer = asyncio.create_task(self._write())
+
+    def offer(self, frame: str) -> bool:
+        """
+        Enqueue an encoded frame without waiting, returns False if the frame was not queued.
+        """
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.policy == "drop_oldest":
+            SLOW_CONSUMERS.inc()
+            self.queue.get_nowait()
+            self.queue.put_nowait(frame)
+            return True
+
+        self.evict()
+        return False
+
+    def close(self, code: int = 1000, reason: str = None):
+        """
+        Close the socket once every message queued before has been sent.
+        """
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(_Close(code, reason))
+        except asyncio.QueueFull:
+            self.evict()
+            return
+        self.closed = True
+
+    async def wait_closed(self):
+        """
+        Wait until the writer has stopped, every send is bounded by send_timeout.
+        """
+        await asyncio.wait([self.writer])
+
+    def evict(self):
+        """
+        Drop a slow consumer: pending messages are discarded and the socket is closed.
+        """
+        if self.writer.done():
+            return
+        print(f"[WARN] Evicting slow consumer {self.websocket.client}")
+        SLOW_CONSUMERS.inc()
+        self.stop()
+        asyncio.create_task(self._close_socket(1008, SLOW_CONSUMER_REASON))
+
+    def stop(self):
+        """
+        Stop the writer without closing the socket (the socket is already gone).
+        """
+        self.closed = True
+        self.writer.cancel()
+        self._finish()
+
+    async def _write(self):
+        try:
+            while True:
+                frame = await self.queue.get()
+                if isinstance(frame, _Close):
+                    await self._close_socket(frame.code, frame.reason)
+                    return
+                started = time.perf_counter()
+                try:
+                    await asyncio.wait_for(self.websocket.send_text(frame), self.send_timeout)
+                except asyncio.TimeoutError:
+                    self.evict()
+                    return
+                SEND_LATENCY.observe(time.perf_counter() - started)
+                # On Python 3.11 wait_for swallows a cancellation arriving as the send completes,
+                # the writer would then wait on the queue forever.
+                if self.writer.cancelling():
+                    return
+        #pylint: disable=broad-exception-caught
+        except Exception:
+            # The client went away, its handler will notice on its next receive.
+            self.closed = True
+        finally:
+            self._finish()
+
+    def _finish(self):
+        if self.on_close:
+            on_close, self.on_close = self.on_close, None
+            on_close(self)
+
+    async def _close_socket(self, code: int, reason: str):
+        #pylint: disable=broad-exception-caught
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code, reason=reason), self.send_timeout)
+        except Exception:
+            pass
+
+class _Close:
+    """Queue marker asking the writer to close the socket."""
+    __slots__ = ("code", "reason")
+
+    def __init__(self, code: int, reason: str):
+        self.code = code
+        self.reason = reason
@@ -0,0 +1,31 @@
+"""
+Token bucket used to rate limit the messages a client sends on a WebSocket.
+"""
+
+import time
+
+class TokenBucket:
+    """
+    Holds up to burst tokens, refilled at rate tokens per second.
+    Every accepted message takes a token, so a client can send burst messages at once and
+    rate messages per second after that.
+    """
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self, now: float = None) -> bool:
+        """
+        Take a token, returns False if the bucket is empty and the message must be rejected.
+        """
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
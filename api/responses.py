@@ -0,0 +1,14 @@
+"""
+Response classes used by the REST endpoints.
+"""
+
+from fastapi.responses import JSONResponse
+
+from utils.serialization import encode_bytes
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with the shared encoder (orjson when available).
+    """
+    def render(self, content) -> bytes:
+        return encode_bytes(content)
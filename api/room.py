@@ -0,0 +1,112 @@
+"""
+Per game state held by the ConnectionManager.
+"""
+
+from collections import deque
+
+from utils.constants import CHAT_HISTORY_SIZE
+
+class Room:
+    """
+    Everything a worker knows about a game, reached with a single lookup by game code.
+
+    players maps the connected players to whether they have chosen this round, and waiting
+    counts those who have not, so checking for both choices does not scan the room.
+    Sockets are kept in dicts used as ordered sets: removal is O(1) and broadcasts keep
+    the connection order.
+    """
+    __slots__ = (
+        "players",
+        "waiting",
+        "tokens",
+        "left_at",
+        "sockets",
+        "chat_sockets",
+        "chat_members",
+        "chat_history",
+        "session",
+        "round_clock",
+        "claimed_round",
+        "claims",
+        "last_activity",
+    )
+
+    def __init__(self, now: float):
+        self.players = {}
+        self.waiting = 0
+        # Reconnection token and time of the last disconnect, per player
+        self.tokens = {}
+        self.left_at = {}
+        # Sockets connected to this worker
+        self.sockets = {}
+        self.chat_sockets = {}
+        self.chat_members = 0
+        # Ring buffer of the last chat messages, created with the first one
+        self.chat_history = None
+        self.session = None
+        # Time of the first choice of the current round
+        self.round_clock = None
+        # Last round checkpointed by a handler of this worker
+        self.claimed_round = 0
+        # First claim applied for each one-time transition (game finished, chat opened)
+        self.claims = {}
+        self.last_activity = now
+
+    def join(self, player_name: str, token):
+        """
+        Mark a player as connected and not having chosen yet, the first token is kept.
+        """
+        if self.players.get(player_name) is not False:
+            self.waiting += 1
+        self.players[player_name] = False
+        self.tokens.setdefault(player_name, token)
+
+    def leave(self, player_name: str, time):
+        """
+        Mark a player as disconnected at the given time.
+        """
+        if player_name in self.players and not self.players.pop(player_name):
+            self.waiting -= 1
+        self.left_at[player_name] = time
+
+    def choose(self, player_name: str):
+        """
+        Mark a connected player as having chosen this round.
+        """
+        if self.players.get(player_name) is False:
+            self.players[player_name] = True
+            self.waiting -= 1
+
+    def clear_choices(self):
+        """
+        Start a new round, no connected player has chosen yet.
+        """
+        for player_name in self.players:
+            self.players[player_name] = False
+        self.waiting = len(self.players)
+
+    def remember_chat(self, messages: list):
+        """
+        Add chat messages to the history, the oldest ones are dropped past CHAT_HISTORY_SIZE.
+        """
+        if self.chat_history is None:
+            self.chat_history = deque(maxlen=CHAT_HISTORY_SIZE)
+        self.chat_history.extend(messages)
+
+    def claim(self, key, claim: str) -> bool:
+        """
+        Record the claim of a one-time transition, True if it is the first one for the key.
+        """
+        return self.claims.setdefault(key, claim) == claim
+
+    def is_full(self) -> bool:
+        """
+        Whether both players are connected.
+        """
+        return len(self.players) == 2
+
+    def is_idle(self) -> bool:
+        """
+        Whether no socket of this worker is connected to the game or its chat.
+        """
+        return not self.sockets and not self.chat_sockets
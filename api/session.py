@@ -0,0 +1,230 @@
+"""
+In-memory state of a game being played.
+"""
+
+from uuid import UUID
+
+from utils.choices import append_choice, last_choice
+from utils.constants import BONUS_ROUNDS
+from utils.game_utils import calculate_score, calculate_forfeit_score
+
+class GameSession:
+    """
+    Authoritative state of a live game, held by the ConnectionManager of every worker.
+
+    A session is only changed by applying events from the bus, rounds are resolved
+    in-process as soon as both choices are known and the result is checkpointed to the
+    database in the background. Field names match the Match / Match_Handler columns.
+    """
+    __slots__ = (
+        "code",
+        "uuid",
+        "player1",
+        "player2",
+        "player1_score",
+        "player2_score",
+        "player1_choices",
+        "player2_choices",
+        "choice_count",
+        "round",
+        "game_state",
+        "is_p1_online",
+        "is_p2_online",
+        "choices",
+        "chat_accepts",
+        "chat_finished",
+    )
+
+    def __init__(
+        self,
+        code: int,
+        uuid: UUID,
+        player1: str = None,
+        player2: str = None,
+        player1_score: int = 0,
+        player2_score: int = 0,
+        player1_choices: int = 0,
+        player2_choices: int = 0,
+        choice_count: int = 0,
+        round: int = 1, #pylint: disable=redefined-builtin
+        game_state: str = "created",
+        is_p1_online: bool = False,
+        is_p2_online: bool = False
+        ):
+        self.code = code
+        self.uuid = uuid
+        self.player1 = player1
+        self.player2 = player2
+        self.player1_score = player1_score
+        self.player2_score = player2_score
+        self.player1_choices = player1_choices
+        self.player2_choices = player2_choices
+        self.choice_count = choice_count
+        self.round = round
+        self.game_state = game_state
+        self.is_p1_online = is_p1_online
+        self.is_p2_online = is_p2_online
+        # State of the round being played
+        self.choices = {}
+        self.chat_accepts = {}
+        self.chat_finished = False
+
+    @classmethod
+    def from_rows(cls, match, match_handler):
+        """
+        Build a session from the database rows of a game.
+        """
+        return cls(
+            match.id,
+            match.uuid,
+            match.player1,
+            match.player2,
+            match.player1_score,
+            match.player2_score,
+            match.player1_choices,
+            match.player2_choices,
+            match.choice_count,
+            match.round,
+            match.game_state,
+            match_handler.is_p1_online,
+            match_handler.is_p2_online,
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict):
+        """
+        Build a session from a snapshot, as published on the event bus.
+        """
+        return cls(**{**snapshot, "uuid": UUID(str(snapshot["uuid"]))})
+
+    def snapshot(self) -> dict:
+        """
+        Copy of the persisted fields, used for checkpoints and to share the session.
+        """
+        return {
+            "code": self.code,
+            "uuid": self.uuid,
+            "player1": self.player1,
+            "player2": self.player2,
+            "player1_score": self.player1_score,
+            "player2_score": self.player2_score,
+            "player1_choices": self.player1_choices,
+            "player2_choices": self.player2_choices,
+            "choice_count": self.choice_count,
+            "round": self.round,
+            "game_state": self.game_state,
+            "is_p1_online": self.is_p1_online,
+            "is_p2_online": self.is_p2_online,
+        }
+
+    def add_player(self, player_name: str):
+        """
+        Take the first free player slot, or mark a returning player as online.
+        Joins are applied in the same order on every worker, so every replica picks the same slot.
+        """
+        if player_name == self.player1 or (not self.player1 and player_name != self.player2):
+            self.player1 = player_name
+            self.is_p1_online = True
+        else:
+            self.player2 = player_name
+            self.is_p2_online = True
+
+    def leave(self, player_name: str):
+        """
+        Mark a player as offline, the game is over once both players have left.
+        """
+        if player_name == self.player1:
+            self.is_p1_online = False
+        else:
+            self.is_p2_online = False
+        if not self.is_p1_online and not self.is_p2_online:
+            self.game_state = "finished"
+
+    def start(self):
+        """
+        Start the game once both players have joined.
+        """
+        if self.game_state == "created":
+            self.game_state = "ongoing"
+
+    def finish(self):
+        """
+        End the game, both players are considered offline.
+        """
+        self.game_state = "finished"
+        self.is_p1_online = False
+        self.is_p2_online = False
+
+    def record_choice(self, player_name: str, round_number: int, choice: int):
+        """
+        Record a player's choice, the round is resolved once both players have chosen.
+        Choices made for another round (e.g. replayed after a reconnection) are ignored.
+        """
+        if round_number != self.round or self.game_state == "finished":
+            return
+        self.choices[player_name] = choice
+        if self.player1 in self.choices and self.player2 in self.choices:
+            self.resolve_round()
+
+    def resolve_round(self):
+        """
+        Apply both choices of the current round and move to the next one.
+        """
+        player1_choice = self.choices[self.player1]
+        player2_choice = self.choices[self.player2]
+        self.player1_choices = append_choice(self.player1_choices, self.choice_count, player1_choice)
+        self.player2_choices = append_choice(self.player2_choices, self.choice_count, player2_choice)
+        self.choice_count += 1
+        bonusRound = self.round in BONUS_ROUNDS
+        score = calculate_score(player1_choice, player2_choice, bonusRound)
+        self.player1_score += score[0]
+        self.player2_score += score[1]
+        self.round += 1
+        self.choices = {}
+        self.chat_accepts = {}
+        self.chat_finished = False
+
+    def forfeit(self, player_name: str):
+        """
+        End the game in favour of the other player.
+        """
+        if player_name == self.player1:
+            scores = calculate_forfeit_score(self.player1_score, self.player2_score, self.round)
+            self.player1_score, self.player2_score = scores
+        else:
+            scores = calculate_forfeit_score(self.player2_score, self.player1_score, self.round)
+            self.player2_score, self.player1_score = scores
+        self.game_state = "finished"
+
+    def last_choices(self) -> list:
+        """
+        Choices of both players in the last round played.
+        """
+        return [
+            last_choice(self.player1_choices, self.choice_count),
+            last_choice(self.player2_choices, self.choice_count)
+        ]
+
+    def store_chat_choice(self, player_name: str, accept: bool):
+        """
+        Record whether the player accepted the chat offered this round.
+        """
+        self.chat_accepts[player_name] = accept
+
+    def has_chat_choices(self) -> bool:
+        """
+        Check if both players have answered the chat request.
+        """
+        return len(self.chat_accepts) == 2
+
+    def is_chat_accepted(self) -> bool:
+        """
+        Check if both players have accepted the chat request.
+        """
+        return self.has_chat_choices() and all(self.chat_accepts.values())
+
+    def is_chat_declined(self) -> bool:
+        """
+        Check if a player has declined the chat request.
+        """
+        return False in self.chat_accepts.values()
@@ -0,0 +1,50 @@
+"""
+Base class of the background writers.
+Handlers only buffer what has to be written, a single task per writer flushes the buffer
+when woken up (or every interval seconds), so a handler never waits on the database.
+"""
+
+import asyncio
+
+class BufferedWriter:
+    """
+    Runs flush() in a background task each time wakeup is set, and at least every interval
+    seconds if one is given. Subclasses buffer the items and implement flush().
+    """
+    def __init__(self, interval: float = None):
+        self.interval = interval
+        self.wakeup = asyncio.Event()
+        self.writer = None
+        self.stopping = False
+
+    async def start(self):
+        """
+        Start the task writing the buffer.
+        """
+        self.writer = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Write what is still buffered and stop.
+        The writer is not cancelled, a flush in progress would lose the batch it took.
+        """
+        self.stopping = True
+        self.wakeup.set()
+        if self.writer:
+            await self.writer
+        await self.flush()
+
+    async def _run(self):
+        while not self.stopping:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """
+        Write everything buffered so far.
+        """
+        raise NotImplementedError
@@ -0,0 +1,62 @@
+"""
+Buffered writer for the chat transcript.
+Chat handlers only append messages to a buffer, a single task writes them with one
+executemany once CHAT_WRITE_BATCH_SIZE messages are waiting or every CHAT_WRITE_INTERVAL
+seconds, so a chat message never waits on the database.
+"""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+
+from asynchronous.buffered_writer import BufferedWriter
+from database.database import unit_of_work
+from database.instrumentation import scope_stats, track_queries
+from database.models import ChatMessage
+from utils.constants import CHAT_WRITE_BATCH_SIZE, CHAT_WRITE_INTERVAL
+
+CHAT_INSERT = insert(ChatMessage.__table__)
+
+class ChatWriter(BufferedWriter):
+    """
+    Appends chat messages to the chat_message table in batches.
+    Messages are timestamped when they are sent, not when they are written.
+    """
+    def __init__(self, batch_size: int = CHAT_WRITE_BATCH_SIZE, interval: float = CHAT_WRITE_INTERVAL):
+        super().__init__(interval)
+        self.batch_size = batch_size
+        self.pending = []
+
+    def add(self, match_uuid, game_code: int, player_name: str, content: str):
+        """
+        Queue a chat message, the write is triggered early once a batch is full.
+        """
+        self.pending.append(
+            {
+                "match_uuid": match_uuid,
+                "game_code": game_code,
+                "player": player_name,
+                "content": content,
+                "sent_at": datetime.now(timezone.utc),
+            }
+        )
+        if len(self.pending) >= self.batch_size:
+            self.wakeup.set()
+
+    async def flush(self):
+        """
+        Write every pending message in a single transaction.
+        """
+        if not self.pending:
+            return
+        messages, self.pending = self.pending, []
+        #pylint: disable=broad-exception-caught
+        try:
+            games = {message["game_code"] for message in messages}
+            with track_queries("chat_writer", scope_stats("chat_writer"), games):
+                async with unit_of_work() as db:
+                    await db.execute(CHAT_INSERT, messages)
+        except Exception as e:
+            print(f"[ERROR] Could not write {len(messages)} chat messages: {e}")
+            # Keep them for the next flush, ahead of the messages queued meanwhile.
+            self.pending = messages + self.pending
@@ -0,0 +1,83 @@
+"""
+Background writer for the in-memory game sessions.
+Handlers only queue a snapshot of the session, the database is written by a single task,
+so the game never waits on it. Snapshots queued for the same game before a flush are
+coalesced, and every flush writes all pending games in one transaction, with a single
+executemany per table.
+"""
+
+from sqlalchemy import bindparam, case, func, update
+
+from asynchronous.buffered_writer import BufferedWriter
+from database.cache import GAME_CACHE
+from database.database import unit_of_work
+from database.instrumentation import scope_stats, track_queries
+from database.models import Match, Match_Handler
+
+# Bound parameters cannot share the name of an updated column, snapshot keys are prefixed.
+MATCH_CHECKPOINT = (
+    update(Match.__table__)
+    .where(
+        Match.id == bindparam("s_code"),
+        Match.round <= bindparam("s_round"),
+        Match.game_state != "finished"
+    )
+    .values(
+        {
+            **{
+                column: bindparam(f"s_{column}")
+                for column in (
+                    "player1", "player2", "player1_score", "player2_score", "player1_choices",
+                    "player2_choices", "choice_count", "round", "game_state"
+                )
+            },
+            # Finished games are never written again, so this is the time of the finishing checkpoint.
+            "finished_at": case((bindparam("s_game_state") == "finished", func.now()))
+        }
+    )
+)
+HANDLER_CHECKPOINT = (
+    update(Match_Handler.__table__)
+    .where(Match_Handler.uuid == bindparam("s_uuid"))
+    .values(is_p1_online=bindparam("s_is_p1_online"), is_p2_online=bindparam("s_is_p2_online"))
+)
+
+class Checkpointer(BufferedWriter):
+    """
+    Writes GameSession snapshots to the Match / Match_Handler rows.
+    A checkpoint never moves a game back to an earlier round and never reopens a finished
+    game, so snapshots written late (or by several workers) are harmless.
+    """
+    def __init__(self):
+        super().__init__()
+        self.pending = {}
+
+    def save(self, session):
+        """
+        Queue a checkpoint of the session as it is now.
+        """
+        self.pending[session.code] = session.snapshot()
+        self.wakeup.set()
+
+    async def flush(self):
+        """
+        Write every pending checkpoint in a single transaction.
+        """
+        if not self.pending:
+            return
+        snapshots, self.pending = self.pending, {}
+        #pylint: disable=broad-exception-caught
+        try:
+            with track_queries("checkpointer", scope_stats("checkpointer"), snapshots):
+                async with unit_of_work() as db:
+                    await self._write(db, list(snapshots.values()))
+            GAME_CACHE.invalidate(*snapshots)
+        except Exception as e:
+            print(f"[ERROR] Could not write checkpoints: {e}")
+            # Keep them for the next flush, unless a newer snapshot was queued meanwhile.
+            self.pending = {**snapshots, **self.pending}
+
+    async def _write(self, db, snapshots: list):
+        parameters = [{f"s_{key}": value for key, value in snapshot.items()} for snapshot in snapshots]
+        await db.execute(MATCH_CHECKPOINT, parameters)
+        await db.execute(HANDLER_CHECKPOINT, parameters)
@@ -0,0 +1,159 @@
+"""
+Pub/sub backends used by the ConnectionManager to share game events between workers.
+Every event published on a bus is applied on every worker subscribed to it, so
+broadcasts and room membership stay correct when the two players of a game are
+connected to different processes or hosts.
+"""
+
+import asyncio
+from os import environ
+from uuid import uuid4
+
+from utils.serialization import encode, decode
+
+EVENT_CHANNEL = "redblue_events"
+# Events changing the replicated game session (player slots, choices, rounds, forfeit, chat
+# state) and electing the handler announcing a transition, every worker must apply them in the
+# same order or the replicas end up with different scores.
+ORDERED_EVENTS = frozenset({
+    "open_session", "join", "leave", "start", "choice", "clear_choices", "forfeit", "finish",
+    "chat_choice", "chat_finished",
+})
+ORDERED_EVENT_TIMEOUT = 10 # seconds a publisher waits for its own ordered event
+
+class EventBus:
+    """
+    Base class for event bus backends.
+    The subscribed handler is called with every event, published locally or remotely.
+    """
+    def __init__(self):
+        self.handler = None
+
+    def subscribe(self, handler):
+        """
+        Register the coroutine called for every event.
+        """
+        self.handler = handler
+
+    async def start(self):
+        """
+        Open the resources needed by the backend.
+        """
+
+    async def stop(self):
+        """
+        Release the resources held by the backend.
+        """
+
+    async def publish(self, event: dict):
+        """
+        Publish an event to every worker.
+        """
+        raise NotImplementedError
+
+class InMemoryEventBus(EventBus):
+    """
+    Single process backend, events are applied right away.
+    """
+    async def publish(self, event: dict):
+        await self.handler(event)
+
+class PostgresEventBus(EventBus):
+    """
+    Multi worker backend built on Postgres LISTEN/NOTIFY.
+    Events are applied locally as soon as they are published (so the publisher can read
+    its own writes) and sent to the other workers through pg_notify. Notifications coming
+    back from this worker are ignored.
+
+    ORDERED_EVENTS are the exception: every worker, the publisher included, applies them in
+    NOTIFY order, so concurrent joins, choices or a forfeit racing the last choice give the
+    same session everywhere. The publisher waits until its own event has come back and been
+    applied.
+    """
+    def __init__(self, channel: str = EVENT_CHANNEL):
+        super().__init__()
+        self.channel = channel
+        self.worker_id = uuid4().hex
+        self.listener = None
+        self.publisher = None
+        self.queue = asyncio.Queue()
+        self.consumer = None
+        # Ordered events published by this worker and not applied yet, by id
+        self.applied = {}
+
+    async def start(self):
+        # Imported here so the in-memory backend does not need a database driver.
+        import asyncpg
+        from database.database import SQL_USERNAME, SQL_PASSWORD, SQL_HOSTNAME, SQL_DATABASE_NAME
+
+        connection_options = {
+            "user": SQL_USERNAME,
+            "password": SQL_PASSWORD,
+            "host": SQL_HOSTNAME,
+            "database": SQL_DATABASE_NAME,
+        }
+        self.listener = await asyncpg.connect(**connection_options)
+        self.publisher = await asyncpg.create_pool(min_size=1, max_size=4, **connection_options)
+        await self.listener.add_listener(self.channel, self._on_notification)
+        self.consumer = asyncio.create_task(self._consume())
+
+    async def stop(self):
+        if self.consumer:
+            self.consumer.cancel()
+        if self.listener:
+            await self.listener.close()
+        if self.publisher:
+            await self.publisher.close()
+
+    async def publish(self, event: dict):
+        if event["type"] not in ORDERED_EVENTS:
+            await self.handler(event)
+            payload = encode({"origin": self.worker_id, "event": event})
+            await self.publisher.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+            return
+        event_id = uuid4().hex
+        applied = self.applied[event_id] = asyncio.get_running_loop().create_future()
+        try:
+            payload = encode({"origin": self.worker_id, "id": event_id, "event": event})
+            await self.publisher.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+            await asyncio.wait_for(applied, ORDERED_EVENT_TIMEOUT)
+        finally:
+            self.applied.pop(event_id, None)
+
+    def _on_notification(self, connection, pid, channel, payload):
+        """
+        Called by asyncpg for every NOTIFY, the events are queued to keep their order.
+        """
+        self.queue.put_nowait(payload)
+
+    async def _consume(self):
+        while True:
+            payload = await self.queue.get()
+            notification = decode(payload)
+            applied = None
+            if notification["origin"] == self.worker_id:
+                applied = self.applied.get(notification.get("id"))
+                if applied is None:
+                    continue
+            #pylint: disable=broad-exception-caught
+            try:
+                await self.handler(notification["event"])
+            except Exception as e:
+                print(f"[ERROR] Could not apply event {notification['event']}: {e}")
+                if applied and not applied.done():
+                    applied.set_exception(e)
+            if applied and not applied.done():
+                applied.set_result(None)
+
+def create_event_bus() -> EventBus:
+    """
+    Create the backend selected by the EVENT_BUS environment variable (memory or postgres).
+    """
+    backend = environ.get("EVENT_BUS", "memory")
+    match backend:
+        case "memory":
+            return InMemoryEventBus()
+        case "postgres":
+            return PostgresEventBus()
+        case _:
+            raise ValueError(f"Unknown event bus backend: {backend}")
@@ -0,0 +1,103 @@
+"""
+Deadline scheduler used for the player disconnect timeouts.
+All deadlines live in a single heap served by one task, so thousands of disconnects
+cost one sleeping task instead of one polling task each.
+"""
+
+import asyncio
+import heapq
+from itertools import count
+
+class DeadlineScheduler:
+    """
+    Runs callbacks once their deadline has passed.
+    Deadlines are identified by a key, scheduling a key again replaces its previous deadline.
+    schedule() is O(log n), cancel() is O(1) (cancelled entries are dropped lazily).
+    """
+    def __init__(self):
+        self.heap = []
+        self.entries = {}
+        self.sequence = count()
+        self.wakeup = asyncio.Event()
+        self.runner = None
+
+    async def start(self):
+        """
+        Start the task serving the deadlines.
+        """
+        self.runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop serving deadlines, pending callbacks are never run.
+        """
+        if self.runner:
+            self.runner.cancel()
+
+    def schedule(self, key, delay: float, callback, *args):
+        """
+        Run callback(*args) in delay seconds, the callback must be a coroutine function.
+        """
+        self.cancel(key)
+        deadline = asyncio.get_running_loop().time() + delay
+        entry = [deadline, next(self.sequence), key, callback, args]
+        self.entries[key] = entry
+        heapq.heappush(self.heap, entry)
+        if self.heap[0] is entry:
+            self.wakeup.set()
+
+    def cancel(self, key) -> bool:
+        """
+        Cancel the deadline registered for a key, returns False if there was none.
+        """
+        entry = self.entries.pop(key, None)
+        if not entry:
+            return False
+        entry[3] = None
+        # Keep the heap from growing with cancelled entries.
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.heap = [entry for entry in self.heap if entry[3]]
+            heapq.heapify(self.heap)
+        return True
+
+    def pending(self) -> int:
+        """
+        Number of deadlines waiting to fire.
+        """
+        return len(self.entries)
+
+    def pending_keys(self):
+        """
+        Keys of the deadlines waiting to fire.
+        """
+        return self.entries.keys()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            while self.heap and not self.heap[0][3]:
+                heapq.heappop(self.heap)
+
+            self.wakeup.clear()
+            if not self.heap:
+                await self.wakeup.wait()
+                continue
+
+            delay = self.heap[0][0] - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, key, callback, args = heapq.heappop(self.heap)
+            del self.entries[key]
+            asyncio.create_task(self._fire(key, callback, args))
+
+    async def _fire(self, key, callback, args):
+        #pylint: disable=broad-exception-caught
+        try:
+            await callback(*args)
+        except Exception as e:
+            print(f"[ERROR] Deadline {key} failed: {e}")
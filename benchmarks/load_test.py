@@ -0,0 +1,363 @@
+"""
+Load generator playing games against a running server through the real websocket protocol.
+
+Every game is played by two simulated players who join, answer the chat offers, pick a
+choice each round, and sometimes forfeit or drop their connection and come back with their
+reconnection token. Latencies are reported per event type along with the throughput.
+
+Run with `python -m benchmarks.load_test --games 200`, see --help for the options.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from urllib.parse import urlsplit, quote
+from urllib.request import Request, urlopen
+
+import websockets
+
+from utils.constants import CHAT_ROUND, MAX_BATCH_GAMES, ROUNDS
+
+# Events ending a game for a player.
+GAME_OVER_EVENTS = ("game_over", "game_over_disconnect_score")
+
+class LoadTestError(Exception):
+    """A simulated player received something it did not expect."""
+
+class Recorder:
+    """
+    Collects latency samples (in seconds) per event type and counts errors.
+    """
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.rounds = 0
+        self.games = 0
+
+    def record(self, name: str, started: float):
+        """
+        Record the time elapsed since started for an event type.
+        """
+        self.samples.setdefault(name, []).append(time.perf_counter() - started)
+
+    def error(self, name: str):
+        """
+        Count an error by type.
+        """
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def report(self, elapsed: float) -> dict:
+        """
+        Summary of the run, latencies are in milliseconds.
+        """
+        return {
+            "elapsed": round(elapsed, 3),
+            "games": self.games,
+            "games_per_second": round(self.games / elapsed, 2),
+            "rounds_per_second": round(self.rounds / elapsed, 2),
+            "errors": self.errors,
+            "latency": {
+                name: summarize(samples) for name, samples in sorted(self.samples.items())
+            }
+        }
+
+def percentile(samples: list, fraction: float) -> float:
+    """
+    Nearest-rank percentile of sorted samples.
+    """
+    index = min(len(samples) - 1, max(0, round(fraction * len(samples)) - 1))
+    return samples[index]
+
+def summarize(samples: list) -> dict:
+    """
+    Count and p50 / p95 / p99 / max of latency samples, in milliseconds.
+    """
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "p50": round(percentile(samples, 0.50) * 1000, 2),
+        "p95": round(percentile(samples, 0.95) * 1000, 2),
+        "p99": round(percentile(samples, 0.99) * 1000, 2),
+        "max": round(samples[-1] * 1000, 2),
+    }
+
+def print_report(report: dict):
+    """
+    Print a run summary as a table.
+    """
+    print(
+        f"[INFO] {report['games']} games in {report['elapsed']}s, "
+        f"{report['games_per_second']} games/s, {report['rounds_per_second']} rounds/s"
+    )
+    if report["errors"]:
+        print(f"[WARN] Errors: {report['errors']}")
+    print(f"{'event':<20}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, summary in report["latency"].items():
+        print(
+            f"{name:<20}{summary['count']:>8}{summary['p50']:>10}"
+            f"{summary['p95']:>10}{summary['p99']:>10}{summary['max']:>10}"
+        )
+
+def create_games(base_url: str, count: int) -> list:
+    """
+    Create the games to play through POST /create/batch.
+    """
+    codes = []
+    while len(codes) < count:
+        request = Request(
+            f"{base_url}/api/create/batch",
+            data=json.dumps({"count": min(MAX_BATCH_GAMES, count - len(codes))}).encode(),
+            headers={"content-type": "application/json"},
+            method="POST"
+        )
+        with urlopen(request) as response:
+            codes += json.loads(response.read())["codes"]
+    return codes
+
+class Plan:
+    """
+    What a simulated game does, drawn once per game.
+    """
+    def __init__(self, options, rng: random.Random):
+        self.accept_chat = [rng.random() < options.chat_accept_rate for _ in range(2)]
+        self.forfeit_round = None
+        self.disconnect_round = None
+        if rng.random() < options.forfeit_rate:
+            self.forfeit_round = rng.randint(1, ROUNDS)
+        # Chat rounds are skipped, the chat session would keep the game on hold, and so are
+        # the rounds from the forfeit on, the game would be over before the player is back.
+        rounds = [
+            number for number in range(2, (self.forfeit_round or ROUNDS + 1))
+            if number not in CHAT_ROUND
+        ]
+        if rounds and rng.random() < options.disconnect_rate:
+            self.disconnect_round = rng.choice(rounds)
+
+class Player:
+    """
+    A simulated player, reacting to the server events until the game is over.
+    """
+    def __init__(self, options, recorder: Recorder, code: str, index: int, plan: Plan, rng):
+        self.options = options
+        self.recorder = recorder
+        self.code = code
+        self.index = index
+        self.name = f"load{code}p{index + 1}"
+        self.plan = plan
+        self.rng = rng
+        self.token = None
+        self.websocket = None
+        self.pending = {}
+
+    def url(self, path: str, token: str = None) -> str:
+        """
+        Websocket URL of an endpoint for this player.
+        """
+        url = f"{self.options.ws_url}/api/{path}/{int(self.code)}?player_name={quote(self.name)}"
+        if token:
+            url += f"&token={token}"
+        return url
+
+    async def receive(self, websocket=None) -> dict:
+        """
+        Wait for the next message, raises LoadTestError if none comes in time.
+        """
+        try:
+            raw = await asyncio.wait_for(
+                (websocket or self.websocket).recv(),
+                self.options.timeout
+            )
+        except asyncio.TimeoutError as e:
+            raise LoadTestError("timeout") from e
+        message = json.loads(raw)
+        if "error" in message:
+            raise LoadTestError(f"error: {message['error']}")
+        return message
+
+    async def send(self, message: dict, websocket=None):
+        """
+        Send a JSON message.
+        """
+        await (websocket or self.websocket).send(json.dumps(message))
+
+    async def play(self):
+        """
+        Play a game from joining to the game over.
+        """
+        self.pending["join"] = time.perf_counter()
+        self.websocket = await websockets.connect(self.url("ws"))
+        try:
+            while True:
+                message = await self.receive()
+                if await self.handle(message):
+                    return
+        except websockets.ConnectionClosed as e:
+            raise LoadTestError("closed") from e
+        finally:
+            await self.websocket.close()
+
+    async def handle(self, message: dict) -> bool:
+        """
+        React to a message, returns True once the game is over.
+        """
+        event = message.get("event")
+        match event:
+            case "game_reconnection_token":
+                self.token = message["reconnection_token"]
+            case "chat_possibilty":
+                self.pending["chat"] = time.perf_counter()
+                accept = self.plan.accept_chat[self.index]
+                await self.send({"event": "chat_accept" if accept else "chat_decline"})
+            case "chat_accepted" | "chat_declined":
+                self.recorder.record("chat_answer", self.pending.pop("chat"))
+            case "game_hold":
+                await self.chat()
+            case "game_round_start":
+                await self.round_start(message["round"])
+            case "game_round_over":
+                if self.index == 0:
+                    self.recorder.rounds += 1
+                self.recorder.record("round", self.pending.pop("round"))
+            case "game_forfeit":
+                if "forfeit" in self.pending:
+                    self.recorder.record("forfeit", self.pending.pop("forfeit"))
+            case _ if event in GAME_OVER_EVENTS:
+                return True
+        return False
+
+    async def round_start(self, round_number: int):
+        """
+        Play a round: drop the connection, forfeit, or pick a choice.
+        """
+        if "join" in self.pending:
+            self.recorder.record("join", self.pending.pop("join"))
+        if "reconnect" in self.pending:
+            self.recorder.record("reconnect", self.pending.pop("reconnect"))
+
+        if self.index == 1 and self.plan.disconnect_round == round_number:
+            self.plan.disconnect_round = None
+            await self.reconnect()
+            return
+
+        await asyncio.sleep(self.rng.uniform(0, self.options.think_time))
+        if self.index == 0 and self.plan.forfeit_round == round_number:
+            self.pending["forfeit"] = time.perf_counter()
+            await self.send({"event": "game_forfeit", "content": "forfeit"})
+            return
+
+        self.pending["round"] = time.perf_counter()
+        await self.send({"event": "game_choice", "content": str(self.rng.randint(0, 1))})
+
+    async def reconnect(self):
+        """
+        Drop the connection and join again with the reconnection token.
+        """
+        await self.websocket.close()
+        await asyncio.sleep(self.options.reconnect_delay)
+        self.pending["reconnect"] = time.perf_counter()
+        self.websocket = await websockets.connect(self.url("ws", self.token))
+
+    async def chat(self):
+        """
+        Join the chat session, exchange a message and let player one close it.
+        """
+        started = time.perf_counter()
+        async with websockets.connect(self.url("chat")) as websocket:
+            while (await self.receive(websocket)).get("event") != "chat_open":
+                pass
+            self.recorder.record("chat_open", started)
+            sent = time.perf_counter()
+            await self.send({"event": "chat_message", "content": "hello"}, websocket)
+            while True:
+                message = await self.receive(websocket)
+                event = message.get("event")
+                # Coalesced messages arrive in a chat_batch frame.
+                if event == "chat_batch":
+                    message = next(
+                        (item for item in message["messages"] if item["player"] == self.name),
+                        message
+                    )
+                    event = message.get("event")
+                if event == "chat_message" and message["player"] == self.name:
+                    self.recorder.record("chat_message", sent)
+                    if self.index == 0:
+                        await self.send({"event": "chat_stop", "content": "stop"}, websocket)
+                elif event in ("chat_ended", "chat_disconnect"):
+                    break
+
+async def play_game(options, recorder: Recorder, code: str, seed: int):
+    """
+    Play a game with two simulated players.
+    """
+    rng = random.Random(seed)
+    plan = Plan(options, rng)
+    started = time.perf_counter()
+    first = Player(options, recorder, code, 0, plan, random.Random(rng.random()))
+    second = Player(options, recorder, code, 1, plan, random.Random(rng.random()))
+    tasks = [asyncio.create_task(first.play())]
+    # The first player waits for the second one, which joins right after.
+    await asyncio.sleep(options.join_gap)
+    tasks.append(asyncio.create_task(second.play()))
+    try:
+        await asyncio.gather(*tasks)
+        recorder.games += 1
+        recorder.record("game", started)
+    except (LoadTestError, OSError, websockets.WebSocketException) as e:
+        recorder.error(str(e) or type(e).__name__)
+        for task in tasks:
+            task.cancel()
+
+async def run(options) -> dict:
+    """
+    Play every game, the games start spread over the ramp up time.
+    """
+    codes = await asyncio.to_thread(create_games, options.url, options.games)
+    recorder = Recorder()
+    started = time.perf_counter()
+
+    async def delayed(index: int, code: str):
+        await asyncio.sleep(options.ramp_up * index / max(1, len(codes)))
+        await play_game(options, recorder, code, options.seed + index)
+
+    await asyncio.gather(*(delayed(index, code) for index, code in enumerate(codes)))
+    return recorder.report(time.perf_counter() - started)
+
+def parse_args(argv=None):
+    """
+    Command line options.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="server base URL")
+    parser.add_argument("--games", type=int, default=50, help="games played concurrently")
+    parser.add_argument("--ramp-up", type=float, default=1.0, help="seconds to start every game")
+    parser.add_argument("--think-time", type=float, default=0.05, help="max seconds before a choice")
+    parser.add_argument("--join-gap", type=float, default=0.05, help="seconds between both joins")
+    parser.add_argument("--chat-accept-rate", type=float, default=0.5)
+    parser.add_argument("--forfeit-rate", type=float, default=0.05)
+    parser.add_argument("--disconnect-rate", type=float, default=0.1)
+    parser.add_argument("--reconnect-delay", type=float, default=0.2)
+    parser.add_argument("--timeout", type=float, default=30, help="seconds to wait for a message")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    options = parser.parse_args(argv)
+    url = urlsplit(options.url)
+    options.ws_url = f"{'wss' if url.scheme == 'https' else 'ws'}://{url.netloc}"
+    return options
+
+def main(argv=None) -> int:
+    """
+    Command line entry point, the exit status is 1 if a game failed.
+    """
+    options = parse_args(argv)
+    report = asyncio.run(run(options))
+    if options.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 1 if report["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
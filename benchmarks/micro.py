@@ -0,0 +1,308 @@
+"""
+Microbenchmarks for the game rules and the ConnectionManager hot paths.
+
+Timings are divided by the time of a calibration loop run in the same process, so results
+recorded on another machine (or a busier one) stay comparable. Every repetition runs in fresh
+processes and the median of the repetitions is reported. Results are compared with
+benchmarks/baseline.json, the run fails if a benchmark got slower than the baseline by more
+than the threshold, or if a manager operation gets much slower as the number of rooms grows.
+
+Run with `python -m benchmarks.micro`, use --save-baseline to record a new baseline.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from api.manager import ConnectionManager
+from utils import game_utils
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+ROOM_COUNTS = [1_000, 10_000]
+# Allowed slowdown compared to the baseline.
+REGRESSION_THRESHOLD = 0.5
+# Allowed per operation slowdown between the smallest and the largest room count.
+SCALING_THRESHOLD = 3.0
+CALLS = 10_000
+CALIBRATION_CALLS = 100_000
+# Passes over the sampled rooms for the lookups, a single pass only takes a millisecond or two.
+LOOKUP_PASSES = 10
+# Event loop iterations a writer needs to finish a send once it took the frame off its queue.
+SEND_ITERATIONS = 3
+
+class FakeSocket:
+    """
+    Stand-in for a websocket, sending and closing do nothing.
+    """
+    async def send_text(self, _frame: str):
+        """Drop the frame."""
+
+    async def close(self, code: int = 1000, reason: str = None):
+        """Nothing to close."""
+
+def per_op(elapsed: float, operations: int) -> float:
+    """
+    Nanoseconds per operation.
+    """
+    return elapsed / operations * 1e9
+
+def calibrate() -> float:
+    """
+    Nanoseconds per iteration of a fixed loop of dict and tuple operations, the unit results
+    are expressed in.
+    """
+    table = {}
+    started = time.perf_counter()
+    for index in range(CALIBRATION_CALLS):
+        table[index & 1023] = (index, index + 1)
+        table.get(index & 511)
+    return per_op(time.perf_counter() - started, CALIBRATION_CALLS)
+
+def bench_generate_random_code() -> float:
+    """generate_random_code(7)"""
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        game_utils.generate_random_code(7)
+    return per_op(time.perf_counter() - started, CALLS)
+
+def bench_calculate_score() -> float:
+    """calculate_score over every pair of choices, with and without bonus"""
+    cases = [(first, second, bonus) for first in (0, 1) for second in (0, 1) for bonus in (False, True)]
+    started = time.perf_counter()
+    for _ in range(CALLS // len(cases)):
+        for first, second, bonus in cases:
+            game_utils.calculate_score(first, second, bonus)
+    return per_op(time.perf_counter() - started, CALLS // len(cases) * len(cases))
+
+def bench_calculate_forfeit_score() -> float:
+    """calculate_forfeit_score for every round"""
+    started = time.perf_counter()
+    for _ in range(CALLS // 10):
+        for rounds in range(1, 11):
+            game_utils.calculate_forfeit_score(12, -6, rounds)
+    return per_op(time.perf_counter() - started, CALLS // 10 * 10)
+
+@contextlib.contextmanager
+def gc_paused():
+    """
+    Collect the garbage, then keep the collector off for the block.
+    With tens of thousands of rooms allocated a collection would otherwise land in whichever
+    measurement happens to trigger it, calibration loop included.
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+@contextlib.contextmanager
+def timed(results: dict, name: str, operations: int):
+    """
+    Record the nanoseconds per operation of the block under name.
+    """
+    with gc_paused():
+        started = time.perf_counter()
+        yield
+        results[name] = per_op(time.perf_counter() - started, operations)
+
+async def settle(manager: ConnectionManager):
+    """
+    Let the writer tasks send what the previous phase queued and finish the cancelled ones,
+    so that work is not timed as part of the next phase.
+    """
+    while any(not channel.queue.empty() for channel in manager.channels.values()):
+        await asyncio.sleep(0)
+    for _ in range(SEND_ITERATIONS):
+        await asyncio.sleep(0)
+
+async def bench_manager(rooms: int) -> dict:
+    """
+    Time the manager operations on a manager holding the given number of full rooms.
+    """
+    manager = ConnectionManager()
+    await manager.bus.start()
+    codes = list(range(rooms))
+    sockets = {code: (FakeSocket(), FakeSocket()) for code in codes}
+    # Calls are spread over every room so the lookups are not served from a single entry.
+    sample = [codes[index * rooms // CALLS] for index in range(CALLS)] if rooms >= CALLS else (
+        codes * (CALLS // rooms + 1)
+    )[:CALLS]
+    results = {}
+
+    with timed(results, "connect", 2 * rooms):
+        for code in codes:
+            await manager.connect(code, "player1", sockets[code][0])
+            await manager.connect(code, "player2", sockets[code][1])
+    await settle(manager)
+
+    with timed(results, "has_choice", LOOKUP_PASSES * CALLS):
+        for _ in range(LOOKUP_PASSES):
+            for code in sample:
+                await manager.has_choice(code)
+
+    with timed(results, "is_room_full", LOOKUP_PASSES * CALLS):
+        for _ in range(LOOKUP_PASSES):
+            for code in sample:
+                await manager.is_room_full(code)
+
+    message = {"event": "game_round_start", "round": 1, "message": "Round 1 has started."}
+    with timed(results, "broadcast", CALLS):
+        for code in sample:
+            await manager.broadcast(code, message)
+    await settle(manager)
+
+    with timed(results, "disconnect", rooms):
+        for code in codes:
+            await manager.disconnect(code, sockets[code][1], "player2")
+    await settle(manager)
+
+    with timed(results, "delete_room", rooms):
+        for code in codes:
+            await manager.delete_room(code)
+
+    writers = [channel.writer for channel in manager.channels.values()]
+    for channel in list(manager.channels.values()):
+        channel.stop()
+    await asyncio.gather(*writers, return_exceptions=True)
+    await manager.bus.stop()
+    return results
+
+def measure(rooms: int = None) -> dict:
+    """
+    Run the game_utils benchmarks, or the manager ones with the given number of rooms.
+    Returns {name: (calibration units, ns per operation)}.
+    """
+    with gc_paused():
+        unit = min(calibrate() for _ in range(3))
+    timings = {}
+    if rooms is None:
+        for function in (bench_generate_random_code, bench_calculate_score, bench_calculate_forfeit_score):
+            with gc_paused():
+                timings[f"game_utils.{function.__name__.removeprefix('bench_')}"] = function()
+    else:
+        # The manager prints on joins, keep the report readable.
+        with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+            # The first manager run of a process is slower (allocator and caches warming up),
+            # it is not measured.
+            asyncio.run(bench_manager(min(rooms, 1_000)))
+            for operation, value in asyncio.run(bench_manager(rooms)).items():
+                timings[f"manager.{operation}[{rooms}]"] = value
+    return {name: (value / unit, value) for name, value in timings.items()}
+
+def run_benchmarks(room_counts, repeat: int) -> dict:
+    """
+    Run every benchmark repeat times and keep the median.
+    Each room count of each repetition is measured in a fresh process, a process that happens
+    to be faster or slower than usual then only moves one sample.
+    Returns the results in calibration units and in ns per operation.
+    """
+    samples = {}
+    context = multiprocessing.get_context("spawn")
+    for _ in range(repeat):
+        for rooms in (None, *room_counts):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                for name, value in pool.submit(measure, rooms).result().items():
+                    samples.setdefault(name, []).append(value)
+    return (
+        {name: round(statistics.median(unit for unit, _ in values), 2) for name, values in samples.items()},
+        {name: round(statistics.median(ns for _, ns in values), 1) for name, values in samples.items()},
+    )
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Return the benchmarks slower than the baseline by more than the threshold.
+    """
+    regressions = []
+    print(f"{'benchmark':<36}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, value in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:<36}{'-':>12}{value:>12.2f}{'new':>10}")
+            continue
+        change = value / reference - 1
+        flag = " !" if change > threshold else ""
+        print(f"{name:<36}{reference:>12.2f}{value:>12.2f}{change:>+10.0%}{flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+def check_scaling(results: dict, room_counts, threshold: float) -> list:
+    """
+    Return the manager operations whose cost per operation grows with the number of rooms.
+    """
+    smallest, largest = min(room_counts), max(room_counts)
+    failures = []
+    for name, value in results.items():
+        if not name.endswith(f"[{largest}]") or smallest == largest:
+            continue
+        reference = results[name.replace(f"[{largest}]", f"[{smallest}]")]
+        if value > reference * threshold:
+            print(
+                f"[WARN] {name} is {value / reference:.1f}x slower per operation "
+                f"than with {smallest} rooms"
+            )
+            failures.append(name)
+    return failures
+
+def main(argv=None) -> int:
+    """
+    Command line entry point, the exit status is 1 if a gate failed.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="record the results as baseline")
+    parser.add_argument("--output", help="also write the results to this file")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--scaling-threshold", type=float, default=SCALING_THRESHOLD)
+    parser.add_argument("--rooms", type=int, nargs="+", default=ROOM_COUNTS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    results, timings_ns = run_benchmarks(args.rooms, args.repeat)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "unit": "calibration loop iterations",
+        "results": results,
+        "ns_per_op": timings_ns,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"[INFO] Baseline written to {args.baseline}")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            recorded = json.load(file)
+        if recorded.get("unit") == report["unit"]:
+            baseline = recorded["results"]
+        else:
+            print(f"[WARN] Baseline at {args.baseline} is in {recorded.get('unit')}, record it again.")
+    else:
+        print(f"[WARN] No baseline at {args.baseline}, run with --save-baseline first.")
+
+    regressions = compare(results, baseline, args.threshold)
+    failures = check_scaling(results, args.rooms, args.scaling_threshold)
+    if regressions:
+        print(f"[ERROR] Slower than the baseline by more than {args.threshold:.0%}: {regressions}")
+    return 1 if regressions or failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
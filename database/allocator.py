@@ -0,0 +1,116 @@
+"""
+Game code allocator.
+Codes come from a Postgres sequence mapped through a bijective scramble of the 7 digit
+space, so every code is unique without checking the table first, and consecutive games
+do not get consecutive codes. Any number of games is created in a single round-trip.
+When sharding, every shard has its own sequence and the scramble covers the codes of this
+worker's shard only (see utils/sharding.py).
+"""
+
+from math import gcd
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+
+from database.models import MATCH_CODE_SEQUENCE, Match, Match_Handler
+from utils.sharding import SHARD_CODE_SPACE, SHARD_COUNT, SHARD_INDEX
+
+# The multiplier must be coprime with SHARD_CODE_SPACE for the scramble to be a bijection.
+CODE_MULTIPLIER = 4_562_737
+CODE_OFFSET = 2_718_281
+
+if gcd(CODE_MULTIPLIER, SHARD_CODE_SPACE) != 1:
+    raise ValueError(f"SHARD_COUNT={SHARD_COUNT} is not supported by the code scramble")
+
+class CodeSpaceExhausted(Exception):
+    """
+    Every code of this worker's shard is taken by a game still in the match table.
+    """
+
+def scalar_defaults(model) -> list:
+    """
+    Columns of a model with a scalar Python side default.
+    Those defaults are not bound for an INSERT ... SELECT, so they are selected as literals.
+    """
+    return [
+        column for column in model.__table__.columns
+        if column.default is not None and column.default.is_scalar and column.default.arg is not None
+    ]
+
+MATCH_DEFAULTS = scalar_defaults(Match)
+HANDLER_DEFAULTS = scalar_defaults(Match_Handler)
+
+def default_literals(columns) -> list:
+    """
+    Literal SQL values of the column defaults.
+    """
+    return [literal(column.default.arg, column.type) for column in columns]
+
+def scramble_code(value):
+    """
+    Map a sequence value to a game code of this worker's shard.
+    Works on plain integers as well as on SQL expressions.
+    """
+    return (value * CODE_MULTIPLIER + CODE_OFFSET) % SHARD_CODE_SPACE * SHARD_COUNT + SHARD_INDEX
+
+def next_code():
+    """
+    SQL expression drawing the next game code of this worker's shard.
+    """
+    return scramble_code(MATCH_CODE_SEQUENCE.next_value())
+
+async def create_match(db) -> int:
+    """
+    Insert a new match and its handler, returns the game code.
+    The caller commits.
+    """
+    codes = await create_matches(db, 1)
+    return codes[0]
+
+async def create_matches(db, count: int) -> list:
+    """
+    Insert count matches and their handlers, returns the game codes.
+    The caller commits.
+    All the rows are inserted by a single statement, codes are only drawn again when they hit
+    a game created before the allocator existed (or kept after the sequence wrapped around).
+    Raises CodeSpaceExhausted once a whole cycle of the sequence was drawn without finding
+    enough free codes.
+    """
+    codes = []
+    drawn = 0
+    while len(codes) < count:
+        if drawn >= SHARD_CODE_SPACE:
+            raise CodeSpaceExhausted(
+                f"No free game code left in shard {SHARD_INDEX} of {SHARD_COUNT}, archive finished games"
+            )
+        drawn += count - len(codes)
+        new_matches = (
+            insert(Match)
+            .from_select(
+                ["id", "uuid", *(column.name for column in MATCH_DEFAULTS)],
+                select(
+                    next_code(),
+                    func.gen_random_uuid(),
+                    *default_literals(MATCH_DEFAULTS)
+                )
+                .select_from(func.generate_series(1, count - len(codes))),
+                include_defaults=False
+            )
+            .on_conflict_do_nothing()
+            .returning(Match.id, Match.uuid)
+            .cte("new_matches")
+        )
+        new_handlers = (
+            insert(Match_Handler)
+            .from_select(
+                ["uuid", *(column.name for column in HANDLER_DEFAULTS)],
+                select(new_matches.c.uuid, *default_literals(HANDLER_DEFAULTS)),
+                include_defaults=False
+            )
+            .cte("new_handlers")
+        )
+        created = (await db.scalars(select(new_matches.c.id).add_cte(new_handlers))).all()
+        if len(created) < count - len(codes):
+            print("[INFO] Code already exists, drawing a new one...")
+        codes += created
+    return codes
@@ -0,0 +1,132 @@
+"""
+Archival of finished games.
+Games finished for longer than the retention are moved from match to match_archive and their
+match_handler rows are deleted, so the live tables only hold recent games. Each batch is a
+single statement in its own transaction, and rows locked by another worker are skipped.
+
+Run once with `python -m database.archive`, every worker also runs it periodically.
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from os import environ
+
+from sqlalchemy import delete, insert, select
+
+from database.database import unit_of_work
+from database.models import Match, MatchArchive, Match_Handler
+from utils.metrics import GAMES_ARCHIVED
+
+ARCHIVE_RETENTION_HOURS = float(environ.get("ARCHIVE_RETENTION_HOURS", 24 * 7))
+# Seconds between two runs of the background job, 0 disables it.
+ARCHIVE_INTERVAL = float(environ.get("ARCHIVE_INTERVAL", 300))
+ARCHIVE_BATCH_SIZE = int(environ.get("ARCHIVE_BATCH_SIZE", 1000))
+
+ARCHIVED_COLUMNS = [column.name for column in Match.__table__.columns]
+
+def archive_statement(cutoff: datetime, batch_size: int):
+    """
+    Statement moving up to batch_size games finished before cutoff, returning their codes.
+    """
+    batch = (
+        select(Match.uuid)
+        .where(Match.game_state == "finished", Match.finished_at < cutoff)
+        .order_by(Match.finished_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    moved = (
+        delete(Match)
+        .where(Match.uuid.in_(batch.scalar_subquery()))
+        .returning(*Match.__table__.columns)
+        .cte("moved")
+    )
+    handlers = (
+        delete(Match_Handler)
+        .where(Match_Handler.uuid == moved.c.uuid)
+        .cte("deleted_handlers")
+    )
+    return (
+        insert(MatchArchive)
+        .from_select(ARCHIVED_COLUMNS, select(*(moved.c[name] for name in ARCHIVED_COLUMNS)))
+        .returning(MatchArchive.id)
+        .add_cte(handlers)
+    )
+
+async def archive_finished(
+    retention_hours: float = ARCHIVE_RETENTION_HOURS,
+    batch_size: int = ARCHIVE_BATCH_SIZE
+    ) -> int:
+    """
+    Archive every game finished for longer than the retention, returns the number moved.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=retention_hours)
+    moved = 0
+    batches = 0
+    while True:
+        async with unit_of_work() as db:
+            count = len((await db.scalars(archive_statement(cutoff, batch_size))).all())
+        moved += count
+        batches += 1
+        GAMES_ARCHIVED.inc(count)
+        if count < batch_size:
+            break
+    print(f"[INFO] Archived {moved} finished games in {batches} batches.")
+    return moved
+
+class Archiver:
+    """
+    Background task archiving the finished games every ARCHIVE_INTERVAL seconds.
+    """
+    def __init__(self, interval: float = ARCHIVE_INTERVAL):
+        self.interval = interval
+        self.task = None
+
+    async def start(self):
+        """
+        Start the periodic archival, unless it is disabled.
+        """
+        if self.interval > 0:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop the periodic archival.
+        """
+        if self.task:
+            self.task.cancel()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            #pylint: disable=broad-exception-caught
+            try:
+                await archive_finished()
+            except Exception as e:
+                print(f"[ERROR] Could not archive finished games: {e}")
+
+def main(argv=None) -> int:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--retention-hours",
+        type=float,
+        default=ARCHIVE_RETENTION_HOURS,
+        help="archive the games finished for longer than this (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=ARCHIVE_BATCH_SIZE,
+        help="games moved per statement (default: %(default)s)"
+    )
+    args = parser.parse_args(argv)
+    asyncio.run(archive_finished(args.retention_hours, args.batch_size))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
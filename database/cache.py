@@ -0,0 +1,132 @@
+"""
+Read-through cache of game summaries for the lookup endpoints.
+A game's row only changes when the checkpointer writes a transition (join, round resolution,
+forfeit, finish) or on a debug reset, both invalidate the game here after committing.
+The TTL bounds how stale a game written by another worker can be.
+"""
+
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+from database.models import Match, MatchArchive
+from utils.constants import GAME_CACHE_SIZE, GAME_CACHE_TTL
+from utils.metrics import GAME_CACHE_HITS, GAME_CACHE_MISSES
+
+SUMMARY_FIELDS = ("id", "uuid", "player1", "player2", "player1_score", "player2_score", "round", "game_state")
+
+class GameCache:
+    """
+    LRU of game summaries keyed by code, with an index by uuid.
+    Archived games are keyed by uuid only, their codes may belong to new games.
+    Entries expire ttl seconds after being loaded.
+    """
+    def __init__(self, size: int = GAME_CACHE_SIZE, ttl: float = GAME_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.codes = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, game_code: int):
+        """
+        Cached summary of a game, None if it is not cached or expired.
+        """
+        entry = self.entries.get(game_code)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self.invalidate(game_code)
+            GAME_CACHE_MISSES.inc()
+            return None
+        self.entries.move_to_end(game_code)
+        GAME_CACHE_HITS.inc()
+        return entry[1]
+
+    def get_by_uuid(self, uuid: str):
+        """
+        Cached summary of a game looked up by uuid.
+        """
+        key = self.codes.get(uuid, uuid)
+        entry = self.entries.get(key)
+        if entry is None or entry[1]["uuid"] != uuid:
+            GAME_CACHE_MISSES.inc()
+            return None
+        return self.get(key)
+
+    def put(self, summary: dict, archived: bool = False):
+        """
+        Cache a summary, the least recently used entry is dropped when full.
+        """
+        key = summary["uuid"] if archived else summary["game_code"]
+        replaced = self.entries.get(key)
+        if replaced is not None:
+            self._unindex(key, replaced[1])
+        self.entries[key] = (time.monotonic() + self.ttl, summary)
+        self.entries.move_to_end(key)
+        if not archived:
+            self.codes[summary["uuid"]] = key
+        while len(self.entries) > self.size:
+            dropped_key, (_, dropped) = self.entries.popitem(last=False)
+            self._unindex(dropped_key, dropped)
+
+    def invalidate(self, *game_codes: int):
+        """
+        Drop games whose row changed.
+        """
+        for game_code in game_codes:
+            entry = self.entries.pop(game_code, None)
+            if entry is not None:
+                self._unindex(game_code, entry[1])
+
+    def _unindex(self, key, summary: dict):
+        if self.codes.get(summary["uuid"]) == key:
+            del self.codes[summary["uuid"]]
+
+GAME_CACHE = GameCache()
+
+def to_summary(row) -> dict:
+    """
+    Summary of a game from a row of SUMMARY_FIELDS.
+    """
+    return {
+        "game_code": row.id,
+        "uuid": str(row.uuid),
+        "player1": row.player1,
+        "player2": row.player2,
+        "player1_score": row.player1_score,
+        "player2_score": row.player2_score,
+        "round": row.round,
+        "game_state": row.game_state,
+    }
+
+async def game_summary(db, game_code: int = None, uuid: str = None):
+    """
+    Summary of the game with the given code or uuid, read through the cache.
+    Archived games are only found by uuid, their codes may have been given to new games.
+    Returns None if the game does not exist, missing games are not cached.
+    """
+    summary = GAME_CACHE.get(game_code) if game_code is not None else GAME_CACHE.get_by_uuid(uuid)
+    if summary is not None:
+        return summary
+    archived = False
+    if game_code is not None:
+        row = (await db.execute(
+            select(*(getattr(Match, name) for name in SUMMARY_FIELDS)).where(Match.id == game_code)
+        )).first()
+    else:
+        row = None
+        for model in (Match, MatchArchive):
+            row = (await db.execute(
+                select(*(getattr(model, name) for name in SUMMARY_FIELDS)).where(model.uuid == uuid)
+            )).first()
+            if row is not None:
+                archived = model is MatchArchive
+                break
+    if row is None:
+        return None
+    summary = to_summary(row)
+    GAME_CACHE.put(summary, archived)
+    return summary
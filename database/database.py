@@ -2,11 +2,18 @@
 Module used to connect to the database
 """
 
+import time
+from contextlib import asynccontextmanager
 from os import environ
 
 import dotenv
 from sqlalchemy import create_engine, URL
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from database.instrumentation import instrument
+from utils.metrics import POOL_CHECKOUT_WAIT
 
 env = dotenv.find_dotenv()
 dotenv.load_dotenv(env)
@@ -16,6 +23,10 @@ SQL_PASSWORD = environ.get("DB_PASSWORD")
 SQL_HOSTNAME = environ.get("DB_HOST")
 SQL_DATABASE_NAME =environ.get("DB_NAME")
 
+POOL_SIZE = int(environ.get("DB_POOL_SIZE", 5))
+POOL_MAX_OVERFLOW = int(environ.get("DB_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = float(environ.get("DB_POOL_TIMEOUT", 30))
+
 
 SQLALCHEMY_DATABASE_URL = URL.create(
     "postgresql",
@@ -25,18 +36,75 @@ SQLALCHEMY_DATABASE_URL = URL.create(
     database=SQL_DATABASE_NAME,
 )
 
+ASYNC_SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.set(drivername="postgresql+asyncpg")
+
+# The synchronous engine is only used at startup (schema reflection / creation).
 ENGINE = create_engine(SQLALCHEMY_DATABASE_URL)
 
 SESSIONLOCAL = sessionmaker(autocommit=False, autoflush=False, bind=ENGINE)
 
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Connection pool recording how long each checkout waits for a connection.
+    """
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+# Every endpoint goes through the async engine so that queries never block the event loop.
+ASYNC_ENGINE = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    poolclass=TimedQueuePool,
+    pool_size=POOL_SIZE,
+    max_overflow=POOL_MAX_OVERFLOW,
+    pool_timeout=POOL_TIMEOUT,
+)
+
+# Per request / per game query statistics, see /debug/queries.
+instrument(ENGINE)
+instrument(ASYNC_ENGINE.sync_engine)
+
+# expire_on_commit is disabled so rows read in a unit of work stay readable after its commit,
+# expired attributes cannot be lazy loaded from async code.
+ASYNCSESSIONLOCAL = async_sessionmaker(bind=ASYNC_ENGINE, autoflush=False, expire_on_commit=False)
+
 BASE = declarative_base()
 
-def get_db():
+async def get_db():
     """
-    Method used to get a database reference.
+    Method used to get an async database reference.
     """
-    db = SESSIONLOCAL()
-    try:
+    async with ASYNCSESSIONLOCAL() as db:
         yield db
-    finally:
-        db.close()
+
+
+@asynccontextmanager
+async def unit_of_work():
+    """
+    Open a short lived session for a single state transition.
+    Everything is committed on exit and the connection goes straight back to the pool.
+    Long lived handlers (websockets) should use this instead of holding a session.
+    """
+    async with ASYNCSESSIONLOCAL() as db:
+        yield db
+        await db.commit()
+
+def pool_status() -> dict:
+    """
+    Saturation gauge for the async connection pool.
+    A saturation close to 1 means new units of work are about to wait for a connection.
+    """
+    pool = ASYNC_ENGINE.pool
+    capacity = POOL_SIZE + POOL_MAX_OVERFLOW
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "capacity": capacity,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+        "saturation": round(checked_out / capacity, 3) if capacity else 1.0,
+    }
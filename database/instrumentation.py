@@ -0,0 +1,199 @@
+"""
+SQL statistics per HTTP request route, background task and game, collected by engine event hooks.
+
+Every statement is attributed to the scope of the task running it: HTTP requests are
+tracked by QueryTrackingMiddleware, websocket handlers attach themselves to their game
+with track_game. Batched writes covering several games (checkpoints, chat transcript) also
+count for each of those games, with an even share of the time. Statements repeated within
+a single request or handler are reported, they usually mean a loop issuing one query per
+item, or lookups that could be joined.
+"""
+
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+# Slowest statements kept per scope.
+SLOWEST_STATEMENTS = 5
+# Executions of the same statement within one scope before it is reported.
+REPEATED_QUERY_THRESHOLD = 3
+# Games whose statistics are kept, the least recently active are dropped first.
+MAX_TRACKED_GAMES = 1000
+# Characters of a statement kept in the reports.
+STATEMENT_PREVIEW = 300
+
+class QueryStats:
+    """
+    Aggregated statistics of the statements run in a scope.
+    """
+    __slots__ = ("scopes", "queries", "total_time", "slowest", "repeated")
+
+    def __init__(self):
+        self.scopes = 0
+        self.queries = 0
+        self.total_time = 0.0
+        self.slowest = []
+        self.repeated = {}
+
+    def record(self, statement: str, duration: float):
+        """
+        Add an executed statement.
+        """
+        self.queries += 1
+        self.total_time += duration
+        self._keep_slowest(duration, statement)
+
+    def _keep_slowest(self, duration: float, statement: str):
+        if len(self.slowest) < SLOWEST_STATEMENTS or duration > self.slowest[-1][0]:
+            self.slowest.append((duration, statement))
+            self.slowest.sort(key=lambda entry: entry[0], reverse=True)
+            del self.slowest[SLOWEST_STATEMENTS:]
+
+    def merge(self, other: "QueryStats"):
+        """
+        Add the statistics of another scope.
+        """
+        self.scopes += other.scopes
+        self.queries += other.queries
+        self.total_time += other.total_time
+        for duration, statement in other.slowest:
+            self._keep_slowest(duration, statement)
+        for statement, count in other.repeated.items():
+            self.repeated[statement] = max(self.repeated.get(statement, 0), count)
+
+    def as_dict(self) -> dict:
+        """
+        JSON friendly report, times are in milliseconds.
+        """
+        return {
+            "scopes": self.scopes,
+            "queries": self.queries,
+            "total_ms": round(self.total_time * 1000, 3),
+            "slowest": [
+                {"ms": round(duration * 1000, 3), "statement": statement[:STATEMENT_PREVIEW]}
+                for duration, statement in self.slowest
+            ],
+            "repeated": [
+                {"count": count, "statement": statement[:STATEMENT_PREVIEW]}
+                for statement, count in self.repeated.items()
+            ],
+        }
+
+class QueryScope:
+    """
+    A single request or handler, counts its statements to spot the repeated ones.
+    """
+    __slots__ = ("name", "stats", "statements", "games")
+
+    def __init__(self, name: str, stats: QueryStats, games=()):
+        self.name = name
+        self.stats = stats
+        self.statements = Counter()
+        self.games = games
+        stats.scopes += 1
+
+    def record(self, statement: str, duration: float):
+        """
+        Add an executed statement, warns once it has been repeated too often.
+        """
+        self.stats.record(statement, duration)
+        for game_code in self.games:
+            game_stats(game_code).record(statement, duration / len(self.games))
+        self.statements[statement] += 1
+        count = self.statements[statement]
+        if count >= REPEATED_QUERY_THRESHOLD:
+            self.stats.repeated[statement] = max(self.stats.repeated.get(statement, 0), count)
+            if count == REPEATED_QUERY_THRESHOLD:
+                print(
+                    f"[WARN] {self.name} ran the same statement {count} times: "
+                    f"{' '.join(statement.split())[:STATEMENT_PREVIEW]}"
+                )
+
+CURRENT_SCOPE = ContextVar("query_scope", default=None)
+# Statistics per request route ("GET /api/games") or background task ("checkpointer").
+SCOPE_QUERIES = {}
+GAME_QUERIES = OrderedDict()
+
+def scope_stats(name: str) -> QueryStats:
+    """
+    Statistics of a route or background task, created on first use.
+    """
+    return SCOPE_QUERIES.setdefault(name, QueryStats())
+
+def game_stats(game_code: int) -> QueryStats:
+    """
+    Statistics of a game, created on first use.
+    """
+    stats = GAME_QUERIES.get(game_code)
+    if stats is None:
+        stats = GAME_QUERIES[game_code] = QueryStats()
+        if len(GAME_QUERIES) > MAX_TRACKED_GAMES:
+            GAME_QUERIES.popitem(last=False)
+    else:
+        GAME_QUERIES.move_to_end(game_code)
+    return stats
+
+def track_game(game_code: int):
+    """
+    Attribute the statements of the current task to a game.
+    Every websocket runs in its own task, so the scope ends with the connection.
+    """
+    CURRENT_SCOPE.set(QueryScope(f"game {game_code}", game_stats(game_code)))
+
+@contextmanager
+def track_queries(name: str, stats: QueryStats, games=()):
+    """
+    Attribute the statements run inside the block to the given statistics, and to the
+    games the block writes for, if any.
+    """
+    token = CURRENT_SCOPE.set(QueryScope(name, stats, tuple(games)))
+    try:
+        yield
+    finally:
+        CURRENT_SCOPE.reset(token)
+
+class QueryTrackingMiddleware:
+    """
+    ASGI middleware collecting the statements of every HTTP request per route.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = QueryStats()
+        try:
+            with track_queries(f"{scope['method']} {scope['path']}", stats):
+                await self.app(scope, receive, send)
+        finally:
+            # The route is only known once the request has been routed.
+            route = scope.get("route")
+            key = f"{scope['method']} {route.path if route else 'unmatched'}"
+            scope_stats(key).merge(stats)
+
+def _before_cursor_execute(conn, _cursor, _statement, _parameters, _context, _executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, _cursor, statement, _parameters, _context, _executemany):
+    duration = time.perf_counter() - conn.info["query_started"].pop()
+    scope = CURRENT_SCOPE.get()
+    if scope is not None:
+        scope.record(statement, duration)
+
+def _handle_error(context):
+    started = context.connection.info.get("query_started") if context.connection else None
+    if started:
+        started.pop()
+
+def instrument(engine):
+    """
+    Install the hooks on a synchronous engine (use `sync_engine` for an async one).
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
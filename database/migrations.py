@@ -0,0 +1,100 @@
+"""
+Schema migrations for databases created by earlier versions.
+create_all only creates missing tables, so changes to existing tables are applied here.
+Every migration checks the current schema first and can be run any number of times.
+
+Run them with `python -m database.migrations`, they are also applied on startup.
+"""
+
+from sqlalchemy import inspect, text
+
+from database.database import ENGINE
+from utils.choices import from_legacy, truncate
+
+# Rows converted per statement when migrating the choice histories.
+MIGRATION_BATCH_SIZE = 1000
+
+def migrate_choice_histories(connection):
+    """
+    Convert the string choice histories ("-1" followed by one digit per round)
+    to bit-packed integers, then drop the string columns.
+    Only rounds both players have played are kept, a game stopped mid-round resumes
+    at the start of that round.
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns("match")}
+    if "player1_choice_history" not in columns:
+        return
+
+    print("[INFO] Migrating match choice histories to bit-packed columns.")
+    connection.execute(text(
+        "ALTER TABLE match "
+        "ADD COLUMN IF NOT EXISTS player1_choices INTEGER NOT NULL DEFAULT 0, "
+        "ADD COLUMN IF NOT EXISTS player2_choices INTEGER NOT NULL DEFAULT 0, "
+        "ADD COLUMN IF NOT EXISTS choice_count SMALLINT NOT NULL DEFAULT 0"
+    ))
+
+    last_id = -1
+    while True:
+        rows = connection.execute(
+            text(
+                "SELECT id, player1_choice_history, player2_choice_history FROM match "
+                "WHERE id > :last_id ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": MIGRATION_BATCH_SIZE}
+        ).all()
+        if not rows:
+            break
+
+        updates = []
+        for code, player1_history, player2_history in rows:
+            player1_choices, player1_count = from_legacy(player1_history)
+            player2_choices, player2_count = from_legacy(player2_history)
+            choice_count = min(player1_count, player2_count)
+            updates.append({
+                "id": code,
+                "player1_choices": truncate(player1_choices, choice_count),
+                "player2_choices": truncate(player2_choices, choice_count),
+                "choice_count": choice_count
+            })
+        connection.execute(
+            text(
+                "UPDATE match SET player1_choices = :player1_choices, "
+                "player2_choices = :player2_choices, choice_count = :choice_count "
+                "WHERE id = :id"
+            ),
+            updates
+        )
+        last_id = rows[-1][0]
+
+    connection.execute(text(
+        "ALTER TABLE match DROP COLUMN player1_choice_history, DROP COLUMN player2_choice_history"
+    ))
+
+def add_finished_at(connection):
+    """
+    Add the finished_at column used by the archival job.
+    Games finished before the column existed are stamped with the migration time.
+    """
+    columns = {column["name"] for column in inspect(connection).get_columns("match")}
+    if "finished_at" in columns:
+        return
+
+    print("[INFO] Adding match.finished_at.")
+    connection.execute(text("ALTER TABLE match ADD COLUMN finished_at TIMESTAMP WITH TIME ZONE"))
+    connection.execute(text("UPDATE match SET finished_at = now() WHERE game_state = 'finished'"))
+
+MIGRATIONS = [
+    migrate_choice_histories,
+    add_finished_at,
+]
+
+def run_migrations(engine=ENGINE):
+    """
+    Apply every migration, all of them in a single transaction.
+    """
+    with engine.begin() as connection:
+        for migration in MIGRATIONS:
+            migration(connection)
+
+if __name__ == "__main__":
+    run_migrations()
@@ -4,27 +4,89 @@ Table models for the database
 
 from uuid import uuid4
 
-from sqlalchemy import Column, Integer, String, UUID, BOOLEAN
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Index, Integer, Sequence, SmallInteger, String, UUID, BOOLEAN, func, text
+)
 from sqlalchemy.orm import DeclarativeBase
 
+from utils.sharding import SHARD_CODE_SPACE, SHARD_COUNT, SHARD_INDEX
+
 class Base(DeclarativeBase):
     """This just needs to be here."""
 
+# Feeds the game code allocator, see database/allocator.py.
+# Every shard draws from its own sequence, each value maps to one code of the shard.
+MATCH_CODE_SEQUENCE = Sequence(
+    "match_code_seq" if SHARD_COUNT == 1 else f"match_code_seq_{SHARD_INDEX}",
+    start=0,
+    minvalue=0,
+    maxvalue=SHARD_CODE_SPACE - 1,
+    cycle=True,
+    metadata=Base.metadata
+)
+
 class Match(Base):
     """
     Model for Match class, used to simulate a game.
     """
     __tablename__ = "match"
+    __table_args__ = (
+        # Used by the game listing to filter by state and page by code.
+        Index("ix_match_game_state_id", "game_state", "id"),
+        # Used by the archival job to find the games finished before the retention.
+        Index("ix_match_finished_at", "finished_at", postgresql_where=text("finished_at IS NOT NULL")),
+    )
     uuid = Column(UUID(as_uuid=True), primary_key=True, nullable=False, unique=True)
     id = Column(Integer, primary_key=True, nullable=False, unique=True, index=True)
     player1 = Column(String)
     player2 = Column(String, nullable=True)
     player1_score = Column(Integer, nullable=False, default=0)
     player2_score = Column(Integer, nullable=False, default=0)
-    player1_choice_history = Column(String, nullable=True, default="-1")
-    player2_choice_history = Column(String, nullable=True, default="-1")
+    # One bit per round played, see utils/choices.py.
+    player1_choices = Column(Integer, nullable=False, default=0)
+    player2_choices = Column(Integer, nullable=False, default=0)
+    choice_count = Column(SmallInteger, nullable=False, default=0)
     round = Column(Integer, nullable=False, default=1)
     game_state = Column(String, nullable=False, default="created")
+    # Set by the checkpoint finishing the game.
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class MatchArchive(Base):
+    """
+    Finished matches moved out of the match table, see database/archive.py.
+    """
+    __tablename__ = "match_archive"
+    # Codes are reused once the code sequence wraps around, only the uuid is unique.
+    uuid = Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    id = Column(Integer, nullable=False, index=True)
+    player1 = Column(String)
+    player2 = Column(String, nullable=True)
+    player1_score = Column(Integer, nullable=False)
+    player2_score = Column(Integer, nullable=False)
+    player1_choices = Column(Integer, nullable=False)
+    player2_choices = Column(Integer, nullable=False)
+    choice_count = Column(SmallInteger, nullable=False)
+    round = Column(Integer, nullable=False)
+    game_state = Column(String, nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+class ChatMessage(Base):
+    """
+    Append-only transcript of the chat sessions, written by asynchronous/chat_writer.py.
+    Messages outlive the archival of their match and are looked up by its uuid.
+    """
+    __tablename__ = "chat_message"
+    __table_args__ = (
+        # Used by the transcript endpoint to page a match's messages in order.
+        Index("ix_chat_message_match_uuid_id", "match_uuid", "id"),
+    )
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    match_uuid = Column(UUID(as_uuid=True), nullable=False)
+    game_code = Column(Integer, nullable=False)
+    player = Column(String, nullable=False)
+    content = Column(String(255), nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=False)
 
 class Match_Handler(Base):
     """
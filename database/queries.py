@@ -0,0 +1,33 @@
+"""
+Reusable query helpers.
+"""
+
+import json
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+
+# Below this planner estimate the exact count is cheap enough to run.
+EXACT_COUNT_THRESHOLD = 10_000
+
+async def count_rows(db, statement, exact_below: int = EXACT_COUNT_THRESHOLD):
+    """
+    Count the rows matched by a select statement.
+    Large results are not counted, the planner estimate is returned instead.
+    Returns a (count, is_estimate) tuple.
+    """
+    # Values stay bound parameters, the named paramstyle renders them as :name for text().
+    compiled = statement.compile(
+        dialect=postgresql.dialect(paramstyle="named"),
+        compile_kwargs={"render_postcompile": True}
+    )
+    plan = await db.scalar(text(f"EXPLAIN (FORMAT JSON) {compiled}"), compiled.params)
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    estimate = int(plan[0]["Plan"]["Plan Rows"])
+
+    if estimate >= exact_below:
+        return estimate, True
+
+    count = await db.scalar(select(func.count()).select_from(statement.subquery()))
+    return count, False
@@ -0,0 +1,124 @@
+"""
+Recompute the scores of finished games from their choice histories and report the games
+whose stored scores disagree.
+
+Run with `python -m database.verify_scores`, see --help for the options.
+The exit status is 1 if a mismatch was found.
+"""
+
+import argparse
+import sys
+
+import numpy as np
+from sqlalchemy import select
+
+from database.database import ENGINE
+from database.models import Match, MatchArchive
+from utils.analytics import bonus_mask, decode_histories, score_matches
+from utils.constants import ROUNDS, BONUS_ROUNDS
+
+# Games read and scored per query.
+VERIFY_BATCH_SIZE = 10_000
+
+def verify_batch(rows, bonus) -> list:
+    """
+    Return the rows of a batch whose stored scores cannot be explained by their histories.
+
+    Games played to the end must match exactly. Games that ended early were either forfeited
+    in the next round, by either player (which one is not stored), or finished by a timeout
+    with the scores of the rounds played.
+    """
+    codes, player1_scores, player2_scores, player1_choices, player2_choices, counts = (
+        np.array(column) for column in zip(*rows)
+    )
+    stored = np.stack([player1_scores, player2_scores], axis=1)
+    player1_history = decode_histories(player1_choices, counts)
+    player2_history = decode_histories(player2_choices, counts)
+
+    played = score_matches(player1_history, player2_history, bonus)
+    valid = (stored == played).all(axis=1)
+
+    early = counts < ROUNDS
+    forfeit_rounds = np.where(early, counts + 1, 0)
+    for forfeit_player in (0, 1):
+        forfeited = score_matches(
+            player1_history,
+            player2_history,
+            bonus,
+            forfeit_rounds,
+            np.full(len(rows), forfeit_player)
+        )
+        valid |= early & (stored == forfeited).all(axis=1)
+
+    return [
+        (int(code), tuple(stored[index].tolist()), tuple(played[index].tolist()))
+        for index, code in enumerate(codes)
+        if not valid[index]
+    ]
+
+def verify_scores(engine=ENGINE, bonus_rounds=BONUS_ROUNDS, batch_size=VERIFY_BATCH_SIZE):
+    """
+    Verify every finished game, archived or not, returns the (code, stored scores,
+    recomputed scores) of the games that disagree.
+    """
+    bonus = bonus_mask(ROUNDS, bonus_rounds)
+    mismatches = []
+    checked = 0
+    with engine.connect() as connection:
+        # Archived codes are not unique, the archive is paged by uuid.
+        for model, key in ((Match, Match.id), (MatchArchive, MatchArchive.uuid)):
+            last_key = None
+            while True:
+                statement = (
+                    select(
+                        model.id,
+                        model.player1_score,
+                        model.player2_score,
+                        model.player1_choices,
+                        model.player2_choices,
+                        model.choice_count,
+                        key
+                    )
+                    .where(model.game_state == "finished")
+                    .order_by(key)
+                    .limit(batch_size)
+                )
+                if last_key is not None:
+                    statement = statement.where(key > last_key)
+                rows = connection.execute(statement).all()
+                if not rows:
+                    break
+                mismatches += verify_batch([row[:-1] for row in rows], bonus)
+                checked += len(rows)
+                last_key = rows[-1][-1]
+
+    print(f"[INFO] Checked {checked} finished games, {len(mismatches)} mismatches.")
+    return mismatches
+
+def main(argv=None) -> int:
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--bonus-rounds",
+        type=int,
+        nargs="*",
+        default=BONUS_ROUNDS,
+        help="rounds whose score is doubled (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=VERIFY_BATCH_SIZE,
+        help="games read per query (default: %(default)s)"
+    )
+    args = parser.parse_args(argv)
+
+    mismatches = verify_scores(bonus_rounds=args.bonus_rounds, batch_size=args.batch_size)
+    for code, stored, expected in mismatches:
+        print(f"[WARN] Game {code}: stored {stored}, expected {expected}")
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,13 @@ Debug endpoints for development.
 """
 
 from fastapi import APIRouter, Depends, HTTPException
-from database.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.endpoints import manager
+from database.cache import GAME_CACHE
+from database.database import get_db, pool_status
+from database.instrumentation import GAME_QUERIES, SCOPE_QUERIES
 from database.models import Match, Match_Handler
 
 
@@ -11,22 +17,28 @@ router = APIRouter(prefix="/debug", tags=["debug"])
 
 
 @router.get("/resetGameState/{game_code}")
-async def reset_game_state(game_code: str, db=Depends(get_db)):
+async def reset_game_state(game_code: int, db: AsyncSession = Depends(get_db)):
     """
     Reset the game state for a given game code.
     """
-    match = db.query(Match).filter(Match.id == game_code).first()
-    match_handler = db.query(Match_Handler).filter(Match_Handler.uuid == match.uuid).first()
-    if not match:
+    rows = (await db.execute(
+        select(Match, Match_Handler)
+        .join(Match_Handler, Match_Handler.uuid == Match.uuid)
+        .where(Match.id == game_code)
+    )).first()
+    if not rows:
         raise HTTPException(status_code=404, detail="Game not found")
+    match, match_handler = rows
 
     # Reset the game state
     match.game_state = "created"
     match.player1 = None
     match.player2 = None
-    match.player1_choice_history = "-1"
-    match.player2_choice_history = "-1"
+    match.player1_choices = 0
+    match.player2_choices = 0
+    match.choice_count = 0
     match.round = 1
+    match.finished_at = None
     match.player1_score = 0
     match.player2_score = 0
     match_handler.player1_has_finished_round = False
@@ -38,6 +50,56 @@ async def reset_game_state(game_code: str, db=Depends(get_db)):
     match_handler.chat_finished = False
     match_handler.is_p1_online = False
     match_handler.is_p2_online = False
-    db.commit()
+    await db.commit()
+    GAME_CACHE.invalidate(game_code)
+    # Drop the live session, the game is loaded again from the reset rows.
+    await manager.delete_room(game_code)
 
     return {"message": "Game state reset successfully"}
+
+
+@router.get("/pool")
+async def get_pool_status():
+    """
+    Report how saturated the database connection pool is.
+    """
+    return pool_status()
+
+
+@router.get("/scheduler")
+async def get_scheduler_status():
+    """
+    Number of disconnect deadlines waiting to fire on this worker.
+    """
+    return {"pending": manager.scheduler.pending()}
+
+
+@router.get("/rooms")
+async def get_room_status():
+    """
+    Rooms held by this worker, with the entries and approximate memory of each structure.
+    """
+    return manager.room_stats()
+
+
+@router.get("/queries")
+async def get_query_stats():
+    """
+    Query count, database time and slowest statements per route and background task.
+    """
+    return {
+        name: stats.as_dict()
+        for name, stats in sorted(SCOPE_QUERIES.items(), key=lambda item: -item[1].total_time)
+    }
+
+
+@router.get("/queries/{game_code}")
+async def get_game_query_stats(game_code: int):
+    """
+    Query count, database time and slowest statements of the handlers of a game, and of
+    the batched checkpoint and chat writes covering it (an even share of their time).
+    """
+    stats = GAME_QUERIES.get(game_code)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No queries recorded for this game")
+    return stats.as_dict()
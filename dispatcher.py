@@ -0,0 +1,329 @@
+"""
+Front dispatcher for sharded workers.
+
+Requests for a game (any path ending with a game code, such as /api/ws/{game_code} and
+/api/chat/{game_code}) go to the worker owning the code, other requests are spread over
+the workers in turn. See utils/sharding.py for how codes map to workers.
+
+`python dispatcher.py --workers 4` starts 4 workers on the ports following --port and serves
+them on --port. `uvicorn dispatcher:app` only dispatches, to the worker URLs listed in the
+SHARD_URLS environment variable (comma separated, in shard order).
+"""
+
+import argparse
+import asyncio
+import http.client
+import itertools
+import os
+import re
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import h11
+import uvicorn
+import websockets
+
+from utils.sharding import shard_of
+
+# Path ending with a game code.
+GAME_PATH = re.compile(r"/(\d+)/?$")
+# Headers describing the connection to the dispatcher, not forwarded to the workers.
+HOP_HEADERS = {b"connection", b"keep-alive", b"transfer-encoding", b"upgrade", b"host"}
+PROXY_TIMEOUT = 30 # seconds
+IDLE_CONNECTIONS = 64 # keep-alive connections kept open per worker between requests
+READ_SIZE = 65536
+
+class WorkerConnection:
+    """
+    Keep-alive HTTP/1.1 connection to a worker, parsed with h11.
+    """
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.protocol = h11.Connection(h11.CLIENT)
+        # Whether the worker answered anything on this connection yet
+        self.answered = False
+
+    async def request(self, method: str, target: str, headers: list, body: bytes) -> tuple:
+        """
+        Send a request and read the whole response, returns (status, headers, body).
+        """
+        data = self.protocol.send(h11.Request(method=method, target=target, headers=headers))
+        if body:
+            data += self.protocol.send(h11.Data(data=body))
+        data += self.protocol.send(h11.EndOfMessage())
+        self.writer.write(data)
+        await self.writer.drain()
+
+        status, response_headers, content = None, [], []
+        while True:
+            event = self.protocol.next_event()
+            if event is h11.NEED_DATA:
+                data = await self.reader.read(READ_SIZE)
+                self.answered = self.answered or bool(data)
+                self.protocol.receive_data(data)
+            elif isinstance(event, h11.Response):
+                status = event.status_code
+                response_headers = [(name.decode("latin-1"), value.decode("latin-1")) for name, value in event.headers]
+            elif isinstance(event, h11.Data):
+                content.append(bytes(event.data))
+            elif isinstance(event, (h11.EndOfMessage, h11.ConnectionClosed)):
+                return status, response_headers, b"".join(content)
+
+    def reusable(self) -> bool:
+        """
+        Whether both sides kept the connection open for another request, prepares it if so.
+        """
+        if self.protocol.our_state is h11.DONE and self.protocol.their_state is h11.DONE:
+            self.protocol.start_next_cycle()
+            self.answered = False
+            return True
+        return False
+
+    def close(self):
+        """
+        Close the connection without waiting.
+        """
+        self.writer.close()
+
+class WorkerPool:
+    """
+    Connections to a single worker. Requests reuse an idle connection or open a new one, so
+    the number of requests in flight is only bounded by the workers.
+    """
+    def __init__(self, url: str, idle_connections: int = IDLE_CONNECTIONS):
+        url = urlsplit(url)
+        self.host = url.hostname
+        self.port = url.port
+        self.netloc = url.netloc
+        self.idle_connections = idle_connections
+        self.idle = []
+
+    async def request(self, method: str, target: str, headers: dict, body: bytes) -> tuple:
+        """
+        Forward a request to the worker, returns (status, headers, body).
+        """
+        headers = [("host", self.netloc), *headers.items(), ("content-length", str(len(body)))]
+        while self.idle:
+            connection = self.idle.pop()
+            try:
+                return await self._exchange(connection, method, target, headers, body)
+            except (ConnectionError, h11.RemoteProtocolError):
+                # The worker closed the idle connection (keep-alive timeout) before reading the
+                # request, it is safe to send it again. A request it answered is never resent.
+                if connection.answered:
+                    raise
+        connection = WorkerConnection(*await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), PROXY_TIMEOUT
+        ))
+        return await self._exchange(connection, method, target, headers, body)
+
+    async def _exchange(self, connection: WorkerConnection, method, target, headers, body) -> tuple:
+        try:
+            response = await asyncio.wait_for(
+                connection.request(method, target, headers, body), PROXY_TIMEOUT
+            )
+        except BaseException:
+            connection.close()
+            raise
+        if connection.reusable() and len(self.idle) < self.idle_connections:
+            self.idle.append(connection)
+        else:
+            connection.close()
+        return response
+
+    def close(self):
+        """
+        Close the idle connections.
+        """
+        for connection in self.idle:
+            connection.close()
+        self.idle.clear()
+
+class ShardDispatcher:
+    """
+    ASGI application forwarding HTTP requests and websockets to the worker owning the game.
+    """
+    def __init__(self, urls: list):
+        if not urls:
+            raise ValueError("No worker URLs to dispatch to")
+        self.urls = [url.rstrip("/") for url in urls]
+        self.pools = {url: WorkerPool(url) for url in self.urls}
+        self.next_worker = itertools.cycle(range(len(self.urls)))
+
+    def target(self, path: str) -> str:
+        """
+        URL of the worker serving a path.
+        """
+        found = GAME_PATH.search(path)
+        if found:
+            return self.urls[shard_of(int(found.group(1)), len(self.urls))]
+        return self.urls[next(self.next_worker)]
+
+    async def __call__(self, scope, receive, send):
+        match scope["type"]:
+            case "http":
+                await self.proxy_http(scope, receive, send)
+            case "websocket":
+                await self.proxy_websocket(scope, receive, send)
+            case "lifespan":
+                while True:
+                    message = await receive()
+                    if message["type"] == "lifespan.startup":
+                        await send({"type": "lifespan.startup.complete"})
+                    elif message["type"] == "lifespan.shutdown":
+                        for pool in self.pools.values():
+                            pool.close()
+                        await send({"type": "lifespan.shutdown.complete"})
+                        return
+
+    async def proxy_http(self, scope, receive, send):
+        """
+        Forward a request and its response over a pooled connection to the worker.
+        """
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        path = scope["path"] + (f"?{scope['query_string'].decode()}" if scope["query_string"] else "")
+        headers = {
+            name.decode("latin-1"): value.decode("latin-1")
+            for name, value in scope["headers"] if name not in HOP_HEADERS | {b"content-length"}
+        }
+        pool = self.pools[self.target(scope["path"])]
+        #pylint: disable=broad-exception-caught
+        try:
+            status, response_headers, content = await pool.request(scope["method"], path, headers, body)
+        except Exception as e:
+            print(f"[ERROR] Could not reach worker {pool.netloc}: {e!r}")
+            status, response_headers, content = 502, [], b"Bad Gateway"
+        response_headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in response_headers
+            if name.lower().encode("latin-1") not in HOP_HEADERS | {b"content-length"}
+        ]
+        response_headers.append((b"content-length", str(len(content)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": response_headers})
+        await send({"type": "http.response.body", "body": content})
+
+    async def proxy_websocket(self, scope, receive, send):
+        """
+        Open the same websocket on the worker and relay messages both ways until one side closes.
+        """
+        await receive() # websocket.connect
+        path = scope["path"] + (f"?{scope['query_string'].decode()}" if scope["query_string"] else "")
+        url = "ws" + self.target(scope["path"]).removeprefix("http") + path
+        try:
+            upstream = await websockets.connect(url, max_size=None, open_timeout=PROXY_TIMEOUT)
+        except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+            print(f"[ERROR] Could not open websocket {url}: {e}")
+            # Closing before accepting rejects the handshake.
+            await send({"type": "websocket.close", "code": 1011})
+            return
+        await send({"type": "websocket.accept"})
+
+        async def from_client():
+            while True:
+                message = await receive()
+                if message["type"] == "websocket.disconnect":
+                    await upstream.close()
+                    return
+                text = message.get("text")
+                await upstream.send(text if text is not None else message["bytes"])
+
+        async def from_worker():
+            try:
+                async for message in upstream:
+                    key = "text" if isinstance(message, str) else "bytes"
+                    await send({"type": "websocket.send", key: message})
+            except websockets.ConnectionClosed:
+                pass
+            # 1006 (closed without a close frame) cannot be sent, report it as a server error.
+            code = upstream.close_code if upstream.close_code not in (None, 1005, 1006) else 1011
+            await send({"type": "websocket.close", "code": code, "reason": upstream.close_reason or ""})
+
+        tasks = [asyncio.create_task(from_client()), asyncio.create_task(from_worker())]
+        #pylint: disable=broad-exception-caught
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await upstream.close()
+            for task in tasks:
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+
+def wait_ready(port: int, timeout: float = PROXY_TIMEOUT):
+    """
+    Wait until the worker on the port answers its health check.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        #pylint: disable=broad-exception-caught
+        try:
+            if fetch("127.0.0.1", port, "GET", "/", b"", {})[0] == 200:
+                return
+        except Exception:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Worker on port {port} did not start")
+
+def fetch(host: str, port: int, method: str, path: str, body: bytes, headers: dict):
+    """
+    Blocking HTTP call to a worker, returns (status, headers, body).
+    Only used while starting the workers, before the event loop runs.
+    """
+    connection = http.client.HTTPConnection(host, port, timeout=PROXY_TIMEOUT)
+    try:
+        connection.request(method, path, body=body or None, headers=headers)
+        response = connection.getresponse()
+        return response.status, response.getheaders(), response.read()
+    finally:
+        connection.close()
+
+app = ShardDispatcher(os.environ["SHARD_URLS"].split(",")) if os.environ.get("SHARD_URLS") else None
+
+def main(argv=None):
+    """
+    Start the workers, one per shard, and dispatch to them until interrupted.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of shards")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="dispatcher port, workers use the next ones")
+    args = parser.parse_args(argv)
+
+    ports = [args.port + 1 + index for index in range(args.workers)]
+    workers = []
+    try:
+        for index, port in enumerate(ports):
+            env = {**os.environ, "SHARD_COUNT": str(args.workers), "SHARD_INDEX": str(index)}
+            workers.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+                env=env
+            ))
+            # The first worker creates and migrates the schema, the others start once it is done.
+            if index == 0:
+                wait_ready(port)
+        for port in ports[1:]:
+            wait_ready(port)
+        uvicorn.run(
+            ShardDispatcher([f"http://127.0.0.1:{port}" for port in ports]),
+            host=args.host,
+            port=args.port
+        )
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+
+if __name__ == "__main__":
+    main()
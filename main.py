@@ -2,18 +2,39 @@
 MAIN
 """
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from sqlalchemy import MetaData
+from database.archive import Archiver
 from database.database import ENGINE
+from database.instrumentation import QueryTrackingMiddleware
+from database.migrations import run_migrations
 from database.models import Base
 
-from api import endpoints
+from api import endpoints, monitoring
+from api.responses import FastJSONResponse
 from debug import debug_endpoints
 
 
-app = FastAPI()
+archiver = Archiver()
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Start and stop the game event bus, checkpointer, chat writer and archival with the application."""
+    await endpoints.manager.start()
+    await endpoints.checkpointer.start()
+    await endpoints.chat_writer.start()
+    await archiver.start()
+    yield
+    await archiver.stop()
+    await endpoints.manager.stop()
+    await endpoints.checkpointer.stop()
+    await endpoints.chat_writer.stop()
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 metadata = MetaData()
 metadata.reflect(ENGINE)
 
@@ -23,10 +44,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(QueryTrackingMiddleware)
 app.include_router(endpoints.router, prefix="/api")
 app.include_router(debug_endpoints.router)
+app.include_router(monitoring.router)
 
 Base.metadata.create_all(bind=ENGINE)
+run_migrations(ENGINE)
+# create_all skips existing tables, make sure indexes added later exist as well.
+for table in Base.metadata.sorted_tables:
+    for index in table.indexes:
+        index.create(bind=ENGINE, checkfirst=True)
 
 @app.get("/")
 def main() -> str:
@@ -0,0 +1,84 @@
+"""
+Bulk helpers for analysing finished games.
+"""
+
+import numpy as np
+
+from utils.constants import ROUNDS, BONUS_ROUNDS
+from utils.game_utils import calculate_score, calculate_forfeit_score
+
+# Score of a round indexed by [bonus round, player one choice, player two choice],
+# built from the game rules so both stay in sync.
+PAYOFFS = np.array(
+    [
+        [[calculate_score(first, second, bonus) for second in (0, 1)] for first in (0, 1)]
+        for bonus in (False, True)
+    ],
+    dtype=np.int32
+)
+
+# Score change of the (abandoning, remaining) player for a forfeit in each round,
+# row 0 is used for the games that were not forfeited.
+FORFEIT_DELTAS = np.array(
+    [(0, 0)] + [calculate_forfeit_score(0, 0, rounds) for rounds in range(1, ROUNDS + 1)],
+    dtype=np.int32
+)
+
+def decode_histories(bits, counts, rounds: int = ROUNDS) -> np.ndarray:
+    """
+    Decode many packed choice histories at once.
+    Returns an int8 array of shape (games, rounds), rounds that were not played are -1.
+    """
+    bits = np.asarray(bits, dtype=np.int64).reshape(-1, 1)
+    counts = np.asarray(counts, dtype=np.int64).reshape(-1, 1)
+    index = np.arange(rounds, dtype=np.int64)
+    choices = (bits >> index & 1).astype(np.int8)
+    choices[index >= counts] = -1
+    return choices
+
+def bonus_mask(rounds: int = ROUNDS, bonus_rounds=BONUS_ROUNDS) -> np.ndarray:
+    """
+    Boolean mask of the bonus rounds, index 0 being the first round.
+    """
+    return np.isin(np.arange(1, rounds + 1), bonus_rounds)
+
+def score_matches(
+    player1_choices,
+    player2_choices,
+    bonus=None,
+    forfeit_rounds=None,
+    forfeit_players=None
+    ) -> np.ndarray:
+    """
+    Compute the final scores of many games in one call.
+
+    player1_choices / player2_choices are (games, rounds) arrays as returned by
+    decode_histories, rounds set to -1 are not scored.
+    bonus is a mask of the bonus rounds, either per round or per game and round,
+    it defaults to BONUS_ROUNDS.
+    forfeit_rounds holds the round each game was forfeited in (0 if it was not),
+    forfeit_players who forfeited it (0 for player one, 1 for player two).
+
+    Returns an int32 array of shape (games, 2).
+    """
+    player1_choices = np.asarray(player1_choices)
+    player2_choices = np.asarray(player2_choices)
+    if bonus is None:
+        bonus = bonus_mask(player1_choices.shape[1])
+    bonus = np.broadcast_to(np.asarray(bonus, dtype=bool), player1_choices.shape)
+
+    played = (player1_choices >= 0) & (player2_choices >= 0)
+    rounds = PAYOFFS[
+        bonus.astype(np.intp),
+        np.where(played, player1_choices, 0),
+        np.where(played, player2_choices, 0)
+    ]
+    scores = (rounds * played[..., None]).sum(axis=1, dtype=np.int32)
+
+    if forfeit_rounds is not None:
+        deltas = FORFEIT_DELTAS[np.asarray(forfeit_rounds, dtype=np.intp)]
+        # Deltas are ordered (abandoning, remaining), swap them when player two forfeited.
+        by_player2 = np.asarray(forfeit_players, dtype=bool)[:, None]
+        scores += np.where(by_player2, deltas[:, ::-1], deltas)
+
+    return scores
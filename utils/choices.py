@@ -0,0 +1,60 @@
+"""
+Helpers for the bit-packed choice histories.
+A history is an integer holding one bit per round (round 1 in the lowest bit) together with
+the number of rounds played, so appending a choice is O(1) and never copies the history.
+"""
+
+# Histories used to be stored as strings of digits starting with this marker.
+LEGACY_PREFIX = "-1"
+
+def append_choice(bits: int, count: int, choice: int) -> int:
+    """
+    Return the history with the choice of the next round appended.
+    """
+    return bits | (choice & 1) << count
+
+def choice_at(bits: int, index: int) -> int:
+    """
+    Get the choice made in a round, index 0 being the first round.
+    """
+    return bits >> index & 1
+
+def last_choice(bits: int, count: int) -> int:
+    """
+    Get the choice made in the last round played, -1 if no round was played.
+    """
+    if not count:
+        return -1
+    return choice_at(bits, count - 1)
+
+def truncate(bits: int, count: int) -> int:
+    """
+    Drop the choices made after the first count rounds.
+    """
+    return bits & ((1 << count) - 1)
+
+def to_list(bits: int, count: int) -> list:
+    """
+    Unpack a history into the list of choices, in round order.
+    """
+    return [choice_at(bits, index) for index in range(count)]
+
+def from_list(choices) -> tuple:
+    """
+    Pack a list of choices, returns a (bits, count) tuple.
+    """
+    bits = 0
+    for count, choice in enumerate(choices):
+        bits = append_choice(bits, count, choice)
+    return bits, len(choices)
+
+def from_legacy(history: str) -> tuple:
+    """
+    Pack a legacy string history ("-1" followed by one digit per round).
+    Any non zero digit counts as 1, as it did when scoring the round.
+    """
+    if history is None:
+        return 0, 0
+    if history.startswith(LEGACY_PREFIX):
+        history = history[len(LEGACY_PREFIX):]
+    return from_list([int(digit != "0") for digit in history])
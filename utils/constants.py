@@ -6,8 +6,37 @@ Module used to store code constants and strings.
 
 DISCONNECT_TIMEOUT = 600 # 10 minutes
 CHAT_ROUND = [5,9]
+ROUNDS = 10
+BONUS_ROUNDS = [9,10] # scores are doubled
+MAX_BATCH_GAMES = 1000 # games created by a single POST /create/batch
+
+# Outbound WebSocket queues
+OUTBOUND_QUEUE_SIZE = 64 # messages buffered per socket
+SEND_TIMEOUT = 5 # seconds before a stalled send marks the client as slow
+SLOW_CONSUMER_POLICY = "disconnect" # "disconnect" or "drop_oldest"
+
+# Chat messages
+CHAT_MESSAGE_RATE = 2 # messages per second a player can sustain
+CHAT_MESSAGE_BURST = 5 # messages a player can send at once
+CHAT_BATCH_INTERVAL = 0 # seconds, messages sent within a tick are broadcast as one chat_batch frame, 0 broadcasts each message right away
+CHAT_HISTORY_SIZE = 50 # recent messages kept in memory per room, replayed when the game's next chat session opens
+CHAT_WRITE_BATCH_SIZE = 200 # messages buffered before the transcript is written
+CHAT_WRITE_INTERVAL = 1 # seconds, buffered messages are written at least this often
+
+GAME_COUNT_INTERVAL = 15 # seconds between two counts of the games per state for /metrics
+
+# Rooms without sockets or pending disconnect timeouts are swept once idle for this long
+ROOM_SWEEP_INTERVAL = 60 # seconds between two sweeps
+ROOM_IDLE_TIMEOUT = 900 # seconds, for games that are not over
+FINISHED_ROOM_TIMEOUT = 60 # seconds, for finished games
+
+# Game summaries served by GET /games?game_code= and POST /game
+GAME_CACHE_SIZE = 10_000 # games kept in memory per worker
+GAME_CACHE_TTL = 5 # seconds, bounds how stale a game written by another worker can be
 
 NOT_FOUND_MESSAGE = "Game not found"
+NO_CODE_LEFT_MESSAGE = "No game code is available right now, please try again later."
+WRONG_SHARD_MESSAGE = "Game is served by shard {0}, connect through the dispatcher."
 GAME_FULL_MESSAGE = "Game is full"
 RECONNECTION_TOKEN_MESSAGE = "You have received a reconnection token. This should be used if the user disconnects."
 GAME_IN_PROGRESS_MESSAGE = "Game is already in progress. Please provide a reconnection token."
@@ -26,3 +55,4 @@ WFP_MESSAGE = "Waiting for the other player to finish the round."
 UNEXPECTED_FINISH_MESSAGE = "The game has finished unexpectedly. If you see this, I fucked up."
 DISCONNECT_MESSAGE = "{0} has disconnected"
 GAME_TIMEOUT_MESSAGE = "The game has ended due to inactivity."
+CHAT_RATE_LIMITED_MESSAGE = "You are sending messages too fast, this one was not delivered."
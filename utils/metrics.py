@@ -0,0 +1,213 @@
+"""
+Minimal Prometheus style metrics, rendered in the text exposition format by GET /metrics.
+Recording a value is a few integer operations so the metrics can stay on in production.
+Metrics are kept per worker, Prometheus sums them across the workers it scrapes.
+"""
+
+from bisect import bisect_left
+
+# Latency buckets in seconds.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Buckets for durations involving a player, in seconds.
+PLAYER_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SIZE_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+
+def format_value(value) -> str:
+    """
+    Format a sample value, integers are printed without a decimal part.
+    """
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+def escape_label(value) -> str:
+    """
+    Escape a label value.
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(labels: dict) -> str:
+    """
+    Format a label set as {name="value",...}.
+    """
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + "}"
+
+class Counter:
+    """
+    Value that only goes up.
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        """
+        Increment the counter.
+        """
+        self.value += amount
+
+    def samples(self):
+        """
+        Lines of the metric.
+        """
+        yield f"{self.name} {format_value(self.value)}"
+
+class Gauge:
+    """
+    Value read when the metrics are scraped.
+    The callback returns a number, or a dict mapping a label value to a number.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback, label: str = None):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.label = label
+
+    def samples(self):
+        """
+        Lines of the metric.
+        """
+        value = self.callback()
+        if self.label is None:
+            yield f"{self.name} {format_value(value)}"
+            return
+        for label_value, sample in sorted(value.items()):
+            yield f"{self.name}{format_labels({self.label: label_value})} {format_value(sample)}"
+
+class Histogram:
+    """
+    Distribution of observed values over fixed buckets.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        # The last slot counts the values above every bucket (+Inf).
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value: float):
+        """
+        Record a value.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self):
+        """
+        Lines of the metric, bucket counts are cumulative.
+        """
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield f'{self.name}_bucket{{le="{format_value(bound)}"}} {total}'
+        total += self.counts[-1]
+        yield f'{self.name}_bucket{{le="+Inf"}} {total}'
+        yield f"{self.name}_sum {format_value(self.sum)}"
+        yield f"{self.name}_count {total}"
+
+class Registry:
+    """
+    Set of metrics rendered together.
+    """
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        """
+        Add a metric, a metric registered again under the same name replaces the previous one.
+        """
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        """
+        Create and register a counter.
+        """
+        return self.register(Counter(name, documentation))
+
+    def gauge(self, name: str, documentation: str, callback, label: str = None) -> Gauge:
+        """
+        Create and register a gauge.
+        """
+        return self.register(Gauge(name, documentation, callback, label))
+
+    def histogram(self, name: str, documentation: str, buckets=LATENCY_BUCKETS) -> Histogram:
+        """
+        Create and register a histogram.
+        """
+        return self.register(Histogram(name, documentation, buckets))
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+ROUND_RESOLUTION = REGISTRY.histogram(
+    "game_round_resolution_seconds",
+    "Time from the first choice of a round to its resolution.",
+    PLAYER_BUCKETS
+)
+GAMES_CREATED = REGISTRY.counter(
+    "games_created_total",
+    "Games created through this worker."
+)
+SEND_LATENCY = REGISTRY.histogram(
+    "websocket_send_seconds",
+    "Time taken to write a message to a websocket."
+)
+SLOW_CONSUMERS = REGISTRY.counter(
+    "websocket_slow_consumers_total",
+    "Websockets disconnected or dropping messages because they could not keep up."
+)
+BROADCAST_FANOUT = REGISTRY.histogram(
+    "broadcast_fanout_sockets",
+    "Sockets of this worker reached by a broadcast.",
+    SIZE_BUCKETS
+)
+POOL_CHECKOUT_WAIT = REGISTRY.histogram(
+    "db_pool_checkout_seconds",
+    "Time spent waiting for a database connection from the pool."
+)
+GAME_CACHE_HITS = REGISTRY.counter(
+    "game_cache_hits_total",
+    "Game lookups served from the game summary cache."
+)
+GAME_CACHE_MISSES = REGISTRY.counter(
+    "game_cache_misses_total",
+    "Game lookups that had to query the database."
+)
+GAMES_ARCHIVED = REGISTRY.counter(
+    "games_archived_total",
+    "Finished games moved to the archive by this worker."
+)
+ROOMS_SWEPT = REGISTRY.counter(
+    "rooms_swept_total",
+    "Abandoned rooms forgotten by the sweeper of this worker."
+)
+CHAT_MESSAGES_THROTTLED = REGISTRY.counter(
+    "chat_messages_throttled_total",
+    "Chat events rejected because a player exceeded the chat rate limit."
+)
+CHAT_BATCH_SIZE = REGISTRY.histogram(
+    "chat_batch_messages",
+    "Chat messages coalesced into a single chat_batch broadcast.",
+    SIZE_BUCKETS
+)
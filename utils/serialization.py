@@ -0,0 +1,35 @@
+"""
+JSON encoding shared by the WebSocket frames, the event bus and the REST responses.
+orjson is used when installed, the standard library is the fallback.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def encode_bytes(obj) -> bytes:
+    """
+    Encode an object to UTF-8 JSON, unsupported types are converted with str().
+    """
+    if orjson:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str).encode()
+
+def encode(obj) -> str:
+    """
+    Encode an object to a JSON string, used for WebSocket text frames.
+    """
+    if orjson:
+        return orjson.dumps(obj, default=str).decode()
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def decode(data):
+    """
+    Decode a JSON string or bytes.
+    """
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,30 @@
+"""
+Game code sharding.
+With SHARD_COUNT workers, a game belongs to the worker whose SHARD_INDEX is code % SHARD_COUNT.
+Each worker only allocates codes of its own shard and only serves the websockets of those
+games, so both players of a game always meet on the same worker without a shared event bus.
+"""
+
+from os import environ
+
+SHARD_COUNT = int(environ.get("SHARD_COUNT", 1))
+SHARD_INDEX = int(environ.get("SHARD_INDEX", 0))
+
+if SHARD_COUNT < 1 or not 0 <= SHARD_INDEX < SHARD_COUNT:
+    raise ValueError(f"Invalid shard {SHARD_INDEX} of {SHARD_COUNT}")
+
+CODE_SPACE = 10_000_000
+# Codes of a shard are SHARD_INDEX + n * SHARD_COUNT, with n below SHARD_CODE_SPACE.
+SHARD_CODE_SPACE = CODE_SPACE // SHARD_COUNT
+
+def shard_of(game_code: int, shard_count: int = SHARD_COUNT) -> int:
+    """
+    Shard owning a game.
+    """
+    return game_code % shard_count
+
+def is_local(game_code: int) -> bool:
+    """
+    Whether the game belongs to this worker.
+    """
+    return shard_of(game_code) == SHARD_INDEX